@@ -1,5 +1,5 @@
-```python
 from faker import Faker
+from mapping_utils import build_replacer
 
 faker = Faker("pt_BR")
 
@@ -46,15 +46,8 @@ def anonimizar_texto(textos_paginas: list, itens_sensiveis: dict):
                 falso = faker.word()
         valores_usados.add(falso)
         mapeamento[original] = falso
-    # Realiza as substituições em cada página
-    textos_anonimizados = []
-    # Para evitar substituições parciais indevidas, ordena chaves por comprimento decrescente
-    chaves_sensiveis = sorted(mapeamento.keys(), key=len, reverse=True)
-    for texto in textos_paginas:
-        texto_anon = texto
-        for original in chaves_sensiveis:
-            falso = mapeamento[original]
-            texto_anon = texto_anon.replace(original, falso)
-        textos_anonimizados.append(texto_anon)
+    # Realiza as substituições em cada página, numa única passada por página.
+    # Como a ordenação por comprimento decrescente fazia antes, prioriza o item sensível mais longo em cada posição.
+    substituir = build_replacer(mapeamento)
+    textos_anonimizados = [substituir(texto) for texto in textos_paginas]
     return textos_anonimizados, mapeamento
-```
\ No newline at end of file
@@ -2,15 +2,66 @@ import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import os # Added for os.path.basename
 import json # For json.JSONDecodeError
-import fitz # For fitz.fitz.FZ_ERROR_GENERIC
+import fitz # For the PyMuPDF exception class
 import threading # For asynchronous operations
+import functools # For functools.partial in UI callbacks
+import queue # Worker threads post UI updates through a queue drained on the Tk thread
+import itertools
+import multiprocessing # spawn context for the reversion pool (never fork a process running Tk threads)
+from concurrent.futures import ProcessPoolExecutor # For parallel reversion of large documents
 
 # Importa funções dos módulos criados
-from pdf_utils import extrair_texto, salvar_pdf_anon
-from detection import encontrar_dados_sensiveis
+from pdf_utils import extrair_texto, iterar_texto_paginas, salvar_pdf_anon
+from detection import encontrar_dados_sensiveis, regex_scan_page, warmup as aquecer_deteccao
 from anonymizer import anonimizar_texto
-from validator import validar_anonimizacao
-from mapping_utils import save_mapping, load_mapping # Added
+from validator import carregar_modelo, executar_validacao
+from mapping_utils import save_mapping, load_inverse_mapping # Added
+from mapping_utils import build_replacer, init_revert_worker, revert_one_page
+
+# Quantidade de caracteres exibida nas áreas de pré-visualização
+PREVIEW_CHARS = 500
+# Intervalo (ms) e máximo de itens por ciclo ao esvaziar a fila de atualizações da interface
+UI_QUEUE_INTERVALO_MS = 50
+UI_QUEUE_MAX_POR_CICLO = 50
+# Máximo de entradas do mapeamento exibidas no log
+LOG_MAX_ENTRADAS = 1000
+
+# Abaixo deste número de páginas o custo de iniciar o pool de processos supera o ganho
+MIN_PAGINAS_REVERSAO_PARALELA = 16
+
+# PyMuPDF levanta FileDataError para PDFs corrompidos; versões antigas levantam RuntimeError
+ERRO_PDF = getattr(fitz, "FileDataError", RuntimeError)
+
+# Exceção -> (título, mensagem, status) exibidos ao usuário; vale a primeira entrada compatível
+_PDF_ERROR_TABLE = (
+    (FileNotFoundError, "Erro de Arquivo", "Arquivo não encontrado durante a {op}:\n{e}",
+     "Falha na {op}: arquivo não encontrado."),
+    (ERRO_PDF, "Erro de PDF", "Erro ao processar o arquivo PDF (pode estar corrompido ou não ser um PDF válido):\n{e}",
+     "Falha na {op}: erro no PDF."),
+    (json.JSONDecodeError, "Erro de Mapeamento", "Erro ao decodificar o arquivo de mapeamento (JSON inválido):\n{e}",
+     "Falha na {op}: JSON de mapeamento inválido."),
+    (IOError, "Erro de Arquivo", "Erro de I/O durante a {op} (leitura/escrita):\n{e}",
+     "Falha na {op}: erro de I/O."),
+    (Exception, "Erro Inesperado", "Ocorreu uma falha inesperada durante a {op}:\n{e}",
+     "Falha na {op}."),
+)
+
+def _handle_pdf_errors(operacao, error_handler):
+    """Decorator para métodos executados em threads de trabalho: converte a exceção levantada em
+    título/mensagem/status via _PDF_ERROR_TABLE e os entrega a `error_handler` na thread da interface."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return func(self, *args, **kwargs)
+            except Exception as e:
+                for tipo, titulo, mensagem, status in _PDF_ERROR_TABLE:
+                    if isinstance(e, tipo):
+                        self._post_ui(getattr(self, error_handler), titulo,
+                                      mensagem.format(op=operacao, e=e), status.format(op=operacao))
+                        return
+        return wrapper
+    return decorator
 
 class PDFAnonymizerApp:
     def __init__(self, root):
@@ -23,10 +74,18 @@ class PDFAnonymizerApp:
         # Estado da aplicação
         self.caminho_pdf = None
         self.texto_paginas_original = None
+        self._extracted_key = None # (caminho, mtime) do PDF que gerou texto_paginas_original
         self.texto_paginas_anon = None
         self.mapeamento = None
         self.caminho_pdf_anon_salvo = None # To store path of saved anonymized PDF
         self.caminho_mapeamento_salvo = None # To store path of saved mapping file
+        # Artefatos de reversão derivados de um mapeamento, reconstruídos apenas quando ele muda
+        self._mapeamento_reversao = None
+        self._mapeamento_inverso = None
+        self._reversor = None
+        # Pré-visualizações pendentes, renderizadas de uma vez em root.after_idle
+        self._pending_preview = {}
+        self._preview_flush_agendado = False
         
         # Elementos da interface
         self.label_status = tk.Label(root, text="Selecione um arquivo PDF para começar.", wraplength=580) # Added wraplength
@@ -51,9 +110,13 @@ class PDFAnonymizerApp:
         self.btn_reverter_sessao.config(state="disabled")
         # self.btn_carregar_e_reverter can be enabled by default or after first PDF load
 
-        # Lock for thread-safe operations if needed, though root.after is generally safe for UI updates
+        # Lock for thread-safe operations if needed; worker threads update the UI only through _post_ui
         self.ui_lock = threading.Lock()
         self.validation_thread = None
+        self.extraction_thread = None
+        self.anon_thread = None
+        self._model_lock = threading.Lock() # Evita carregar o modelo de validação duas vezes em paralelo
+        self._ui_queue = queue.Queue()
         
         # Barra de progresso
         self.progress = ttk.Progressbar(root, orient="horizontal", length=500, mode="determinate") # Increased length
@@ -88,20 +151,79 @@ class PDFAnonymizerApp:
         self.log_text_area.pack(side="left", fill="both", expand=True)
         self.log_scroll.pack(side="right", fill="y")
 
+        self.root.after(UI_QUEUE_INTERVALO_MS, self._drain_ui_queue)
+
+        # Pré-carrega o modelo de validação em segundo plano assim que a janela estiver pronta
+        self.root.after_idle(lambda: threading.Thread(target=self._preload_validation_model, daemon=True).start())
+        # Aquece a detecção (regex e spaCy) para que o primeiro clique em "Anonimizar" não pague esse custo
+        self.root.after_idle(lambda: threading.Thread(target=self._warmup_detection, daemon=True).start())
+
+    def _post_ui(self, func, *args):
+        """Agenda `func(*args)` para rodar na thread da interface. Pode ser chamado de qualquer thread."""
+        self._ui_queue.put(functools.partial(func, *args))
+
+    def _drain_ui_queue(self):
+        """Executa as atualizações de interface pendentes e se reagenda."""
+        try:
+            for _ in range(UI_QUEUE_MAX_POR_CICLO):
+                self._ui_queue.get_nowait()()
+        except queue.Empty:
+            pass
+        self.root.after(UI_QUEUE_INTERVALO_MS, self._drain_ui_queue)
+
+    def _preload_validation_model(self):
+        try:
+            with self._model_lock:
+                carregar_modelo()
+        except Exception:
+            pass # The error is reported when the user actually runs the validation
+
+    def _warmup_detection(self):
+        try:
+            aquecer_deteccao()
+        except Exception:
+            pass # Detection errors are reported when the user actually anonymizes
+
     def _update_preview(self, text_area, content):
-        text_area.config(state="normal")
-        text_area.delete("1.0", tk.END)
-        text_area.insert("1.0", content[:500]) # Show first 500 chars
-        text_area.config(state="disabled")
+        """Agenda a atualização da pré-visualização; várias chamadas seguidas resultam em uma única renderização."""
+        self._pending_preview[text_area] = content[:PREVIEW_CHARS] # Show first 500 chars
+        if not self._preview_flush_agendado:
+            self._preview_flush_agendado = True
+            self.root.after_idle(self._flush_previews)
+
+    def _flush_previews(self):
+        """Renderiza apenas o conteúdo mais recente pendente de cada área de pré-visualização."""
+        self._preview_flush_agendado = False
+        pendentes, self._pending_preview = self._pending_preview, {}
+        for text_area, content in pendentes.items():
+            text_area.config(state="normal")
+            text_area.delete("1.0", tk.END)
+            text_area.insert("1.0", content)
+            text_area.config(state="disabled")
 
-    def _update_log_area(self, mapping_data):
+    def _update_preview_pages(self, text_area, pages):
+        """Atualiza a pré-visualização juntando só as páginas necessárias para os primeiros PREVIEW_CHARS caracteres."""
+        buf = []
+        total = 0
+        for pagina in pages:
+            buf.append(pagina)
+            total += len(pagina) + 1
+            if total >= PREVIEW_CHARS:
+                break
+        self._update_preview(text_area, "\n".join(buf))
+
+    def _update_log_area(self, mapping_data, inverso=False):
+        """Mostra o mapeamento no log. Com inverso=True, mapping_data é {falso: original}."""
         self.log_text_area.config(state="normal")
         self.log_text_area.delete("1.0", tk.END)
         if mapping_data:
-            log_entries = []
-            for original, fake in mapping_data.items():
-                log_entries.append(f'\"{original}\" -> \"{fake}\"')
-            self.log_text_area.insert("1.0", "\\n".join(log_entries))
+            pares = ((o, f) for f, o in mapping_data.items()) if inverso else mapping_data.items()
+            # One insert call; very large mappings are truncated so the Text widget stays responsive
+            entradas = itertools.islice(pares, LOG_MAX_ENTRADAS)
+            conteudo = "\n".join(f'"{original}" -> "{fake}"' for original, fake in entradas)
+            if len(mapping_data) > LOG_MAX_ENTRADAS:
+                conteudo += f"\n... ({len(mapping_data) - LOG_MAX_ENTRADAS} mais)"
+            self.log_text_area.insert("1.0", conteudo)
         else:
             self.log_text_area.insert("1.0", "Nenhuma substituição realizada ou mapeamento não disponível.")
         self.log_text_area.config(state="disabled")
@@ -109,132 +231,137 @@ class PDFAnonymizerApp:
     def carregar_pdf(self):
         """Abre um diálogo para selecionar um PDF e carrega seu caminho."""
         file_path = filedialog.askopenfilename(title="Selecione o PDF", filetypes=[("Arquivos PDF", "*.pdf")])
-        if file_path:
-            try:
-                self.caminho_pdf = file_path
-                self.btn_anon.config(state="normal")
-                self.label_status.config(text=f"PDF selecionado: {os.path.basename(file_path)}. Pronto para anonimizar.")
-                # Reset states from previous operations
-                self.texto_paginas_original = None
-                self.texto_paginas_anon = None
-                self.mapeamento = None
-                self.caminho_pdf_anon_salvo = None
-                self.caminho_mapeamento_salvo = None
-                self.btn_validar.config(state="disabled")
-                self.btn_reverter_sessao.config(state="disabled")
-                self._update_preview(self.text_original_preview, "")
-                self._update_preview(self.text_anon_preview, "")
-                self._update_log_area(None) # Clear log on new PDF load
-                # Optionally, extract and show preview of original text here
-                try:
-                    temp_original_text_pages = extrair_texto(self.caminho_pdf)
-                    self._update_preview(self.text_original_preview, "\\n".join(temp_original_text_pages))
-                except fitz.fitz.FZ_ERROR_GENERIC as e:
-                    messagebox.showerror("Erro de PDF", f"Não foi possível ler o arquivo PDF (pode estar corrompido ou não ser um PDF válido):\\n{e}")
-                    self._update_preview(self.text_original_preview, f"Erro ao pré-visualizar: PDF inválido ou corrompido.")
-                    self.caminho_pdf = None # Reset path
-                    self.btn_anon.config(state="disabled")
-                    self.label_status.config(text="Falha ao carregar PDF. Selecione um arquivo válido.")
-                    return
-                except FileNotFoundError:
-                    messagebox.showerror("Erro de Arquivo", f"Arquivo PDF não encontrado: {self.caminho_pdf}")
-                    self._update_preview(self.text_original_preview, "Erro ao pré-visualizar: Arquivo não encontrado.")
-                    self.caminho_pdf = None # Reset path
-                    self.btn_anon.config(state="disabled")
-                    self.label_status.config(text="Falha ao carregar PDF. Arquivo não encontrado.")
-                    return
-                except Exception as e:
-                    messagebox.showerror("Erro Inesperado", f"Ocorreu um erro inesperado ao carregar o PDF:\\n{e}")
-                    self._update_preview(self.text_original_preview, f"Erro ao pré-visualizar: {e}")
-                    self.caminho_pdf = None # Reset path
-                    self.btn_anon.config(state="disabled")
-                    self.label_status.config(text="Falha ao carregar PDF.")
-                    return
-            except Exception as e:
-                messagebox.showerror("Erro Inesperado", f"Ocorreu um erro inesperado ao carregar o PDF:\\n{e}")
-                self.label_status.config(text="Falha ao carregar PDF.")
-                return
-        else:
+        if not file_path:
             # Se nenhum arquivo foi selecionado, não faz nada
             return
+        self.caminho_pdf = file_path
+        self.label_status.config(text=f"PDF selecionado: {os.path.basename(file_path)}. Carregando pré-visualização...")
+        # Reset states from previous operations
+        self.texto_paginas_original = None
+        self.texto_paginas_anon = None
+        self.mapeamento = None
+        self.caminho_pdf_anon_salvo = None
+        self.caminho_mapeamento_salvo = None
+        self._invalidate_reversao()
+        self._update_preview(self.text_original_preview, "")
+        self._update_preview(self.text_anon_preview, "")
+        self._update_log_area(None) # Clear log on new PDF load
+        # Extract the preview in a worker thread so large PDFs don't freeze the window
+        self._set_ui_busy(True)
+        self.extraction_thread = threading.Thread(target=self._extract_preview, args=(file_path,), daemon=True)
+        self.extraction_thread.start()
+
+    @_handle_pdf_errors("leitura do PDF", "_on_preview_error")
+    def _extract_preview(self, caminho_pdf):
+        # Only the first pages are needed to fill the preview, so stop reading once it is full
+        paginas = []
+        total = 0
+        paginas_iter = iterar_texto_paginas(caminho_pdf)
+        try:
+            for pagina in paginas_iter:
+                paginas.append(pagina)
+                total += len(pagina) + 1
+                if total >= PREVIEW_CHARS:
+                    break
+        finally:
+            paginas_iter.close() # Closes the PDF right away
+        self._post_ui(self._on_preview_ready, caminho_pdf, paginas)
+
+    def _on_preview_ready(self, caminho_pdf, paginas):
+        self.extraction_thread = None
+        if caminho_pdf != self.caminho_pdf: # Another PDF was selected meanwhile
+            return
+        self._set_ui_busy(False)
+        self._update_preview_pages(self.text_original_preview, paginas)
+        self.label_status.config(text=f"PDF selecionado: {os.path.basename(caminho_pdf)}. Pronto para anonimizar.")
+
+    def _on_preview_error(self, titulo, mensagem, status):
+        self.extraction_thread = None
+        self.caminho_pdf = None # Reset path
+        self._set_ui_busy(False)
+        messagebox.showerror(titulo, mensagem)
+        self._update_preview(self.text_original_preview, f"Erro ao pré-visualizar: {status}")
+        self.label_status.config(text=status + " Selecione um arquivo válido.")
     
     def anonimizar(self):
-        """Executa a anonimização do PDF selecionado."""
+        """Executa a anonimização do PDF selecionado em uma thread separada."""
         if not self.caminho_pdf:
             messagebox.showerror("Erro de Operação", "Nenhum PDF selecionado para anonimizar.")
             return
+        if self.anon_thread and self.anon_thread.is_alive():
+            messagebox.showinfo("Anonimização", "A anonimização já está em progresso.")
+            return
+
+        self._set_ui_busy(True, indeterminate=False)
+        self.progress["value"] = 0
+        self.label_status.config(text="Extraindo texto do PDF...")
+        self.anon_thread = threading.Thread(target=self._anonimizar_thread, args=(self.caminho_pdf,), daemon=True)
+        self.anon_thread.start()
+
+    def _set_progress(self, value, text):
+        self.progress["value"] = value
+        self.label_status.config(text=text)
+
+    @_handle_pdf_errors("anonimização", "_erro_anonimizacao")
+    def _anonimizar_thread(self, caminho_pdf):
+        """Executa extração, detecção, anonimização e gravação fora da thread da interface."""
+        # 1. Extração do texto (reaproveitada se o mesmo arquivo, inalterado, já foi extraído)
+        chave_extracao = (caminho_pdf, os.path.getmtime(caminho_pdf))
+        if self._extracted_key != chave_extracao or self.texto_paginas_original is None:
+            self.texto_paginas_original = extrair_texto(caminho_pdf)
+            self._extracted_key = chave_extracao
+        self._post_ui(self._update_preview_pages, self.text_original_preview, self.texto_paginas_original)
+        self._post_ui(self._set_progress, 20, "Texto extraído. Detectando dados sensíveis...")
         
-        # For now, anonymization is synchronous. If it becomes too slow, it can also be threaded.
-        # self._set_ui_busy(True)
-        # self.label_status.config(text="Anonimizando... Por favor, aguarde.")
-        # self.root.update_idletasks()
+        # Pages without any text (e.g. scanned images) skip detection; short pages such as "Ana"
+        # are still scanned, and the replacements below are applied to every page
+        paginas_com_texto = [pagina for pagina in self.texto_paginas_original if pagina.strip()]
 
-        try:
-            # 1. Extração do texto
-            self.progress["value"] = 0
-            self.label_status.config(text="Extraindo texto do PDF...")
-            self.root.update_idletasks() # Use update_idletasks
-            
-            self.texto_paginas_original = extrair_texto(self.caminho_pdf)
-            self._update_preview(self.text_original_preview, "\n".join(self.texto_paginas_original))
-            self.progress["value"] = 20
-            self.label_status.config(text="Texto extraído. Detectando dados sensíveis...")
-            self.root.update_idletasks()
-            
-            # 2. Detecção de dados sensíveis
-            itens_sensiveis = encontrar_dados_sensiveis(self.texto_paginas_original)
-            total_encontrados = len(itens_sensiveis)
-            self.progress["value"] = 40
-            self.label_status.config(text=f"{total_encontrados} dado(s) sensível(is) identificado(s). Anonimizando...")
-            self.root.update_idletasks()
-            
-            # 3. Anonimização do texto
-            self.texto_paginas_anon, self.mapeamento = anonimizar_texto(self.texto_paginas_original, itens_sensiveis)
-            self._update_preview(self.text_anon_preview, "\n".join(self.texto_paginas_anon))
-            self.progress["value"] = 60
-            self.label_status.config(text="Texto anonimizado. Salvando arquivos...")
-            self.root.update_idletasks()
-            
-            self._update_log_area(self.mapeamento) # Update log after anonymization
+        # 2. Detecção de dados sensíveis: regex por página, depois NER em lote
+        # (a regex leva microssegundos por página; um pool de processos custaria mais do que economiza)
+        regex_hits = [regex_scan_page(pagina) for pagina in paginas_com_texto]
+        self._post_ui(self._set_progress, 30, "Padrões identificados. Procurando nomes e entidades...")
+        itens_sensiveis = encontrar_dados_sensiveis(paginas_com_texto, regex_hits)
+        total_encontrados = len(itens_sensiveis)
+        self._post_ui(self._set_progress, 40, f"{total_encontrados} dado(s) sensível(is) identificado(s). Anonimizando...")
+        
+        # 3. Anonimização do texto
+        # Todas as páginas: um nome detectado em outra página também é substituído numa página curta
+        self.texto_paginas_anon, self.mapeamento = anonimizar_texto(self.texto_paginas_original, itens_sensiveis)
+        self._prepare_reversao(self.mapeamento)
+        self._post_ui(self._update_preview_pages, self.text_anon_preview, self.texto_paginas_anon)
+        self._post_ui(self._set_progress, 60, "Texto anonimizado. Salvando arquivos...")
+        self._post_ui(self._update_log_area, self.mapeamento) # Update log after anonymization
 
-            # 4. Salvar PDF anonimizado
-            self.caminho_pdf_anon_salvo = salvar_pdf_anon(self.texto_paginas_anon, self.caminho_pdf)
-            self.progress["value"] = 80
-            
-            # 5. Salvar Mapeamento
-            if self.mapeamento:
-                self.caminho_mapeamento_salvo = save_mapping(self.mapeamento, self.caminho_pdf)
-            status_msg = f"PDF anonimizado: {os.path.basename(self.caminho_pdf_anon_salvo)}\nMapeamento: {os.path.basename(self.caminho_mapeamento_salvo)}"
-            
-            self.label_status.config(text=status_msg)
-            self.root.update_idletasks()
-            
-            # Finaliza progresso
-            self.progress["value"] = 100
-            # Habilita os botões de validar e reverter pós-anonimização
-            self.btn_validar.config(state="normal")
-            self.btn_reverter_sessao.config(state="normal")
-            messagebox.showinfo("Concluído", f"Anonimização concluída.\\n{status_msg}")
-
-        except FileNotFoundError: # Should ideally be caught by carregar_pdf, but as a safeguard
-            messagebox.showerror("Erro de Arquivo", f"Arquivo PDF não encontrado: {self.caminho_pdf}")
-            self.label_status.config(text="Falha na anonimização: PDF não encontrado.")
-            self._update_log_area(None)
-        except fitz.fitz.FZ_ERROR_GENERIC as e: # From extrair_texto or salvar_pdf_anon
-            messagebox.showerror("Erro de PDF", f"Erro ao processar o arquivo PDF (pode estar corrompido ou ser um formato não suportado):\\n{e}")
-            self.label_status.config(text="Falha na anonimização: Erro no PDF.")
-            self._update_log_area(None)
-        except IOError as e: # From save_mapping
-            messagebox.showerror("Erro de Arquivo", f"Erro ao salvar o arquivo de mapeamento:\\n{e}")
-            self.label_status.config(text="Falha ao salvar mapeamento.")
-            # Log might still be relevant if anonymization itself was ok
-        except Exception as e:
-            messagebox.showerror("Erro de Anonimização", f"Ocorreu uma falha inesperada durante a anonimização:\\n{e}")
-            self.label_status.config(text="Falha na anonimização.")
-            self._update_log_area(None)
+        # 4. Salvar PDF anonimizado
+        self.caminho_pdf_anon_salvo = salvar_pdf_anon(self.texto_paginas_anon, caminho_pdf)
+        self._post_ui(self._set_progress, 80, "PDF anonimizado salvo. Salvando mapeamento...")
+        
+        # 5. Salvar Mapeamento
+        if self.mapeamento:
+            self.caminho_mapeamento_salvo = save_mapping(self.mapeamento, caminho_pdf)
+        self._post_ui(self._finalizar_anonimizacao)
+
+    def _finalizar_anonimizacao(self):
+        """Atualiza a interface ao término da anonimização."""
+        self.anon_thread = None
+        self._set_ui_busy(False)
+        status_msg = f"PDF anonimizado: {os.path.basename(self.caminho_pdf_anon_salvo)}\nMapeamento: {os.path.basename(self.caminho_mapeamento_salvo)}"
+        self.label_status.config(text=status_msg)
+        # Finaliza progresso
+        self.progress["value"] = 100
+        messagebox.showinfo("Concluído", f"Anonimização concluída.\\n{status_msg}")
+
+    def _erro_anonimizacao(self, titulo, mensagem, status):
+        self.anon_thread = None
+        self._set_ui_busy(False)
+        messagebox.showerror(titulo, mensagem)
+        self.label_status.config(text=status)
+        self._update_log_area(None)
     
-    def _set_ui_busy(self, busy_status: bool):
-        """Helper to enable/disable UI elements during long operations."""
+    def _set_ui_busy(self, busy_status: bool, indeterminate: bool = True):
+        """Helper to enable/disable UI elements during long operations.
+        With indeterminate=False the caller drives the progress bar value itself."""
         state = "disabled" if busy_status else "normal"
         self.btn_carregar.config(state=state)
         # Only enable anon if a PDF is loaded and not busy
@@ -246,22 +373,36 @@ class PDFAnonymizerApp:
         self.btn_carregar_e_reverter.config(state=state)
         
         if busy_status:
-            self.progress.start(10) # Indeterminate progress for background tasks
+            if indeterminate:
+                self.progress.start(10) # Indeterminate progress for background tasks
         else:
             self.progress.stop()
             self.progress['value'] = 0 # Reset determinate progress
 
     def _perform_validation(self):
         try:
-            texto_anon_completo = "\\n".join(self.texto_paginas_anon)
-            # This call can take time (model loading)
-            texto_modelo, indicadores = validar_anonimizacao(texto_anon_completo)
+            # The model is loaded once and cached; only the first call pays the loading time
+            with self._model_lock:
+                tokenizer, modelo = carregar_modelo()
+            # Pages are fed to the model in batched windows, without joining the whole document
+            texto_modelo = ""
+            indicadores = []
+            for texto_gerado, encontrados in executar_validacao(tokenizer, modelo, self.texto_paginas_anon):
+                novos = [i for i in encontrados if i not in indicadores]
+                if novos:
+                    indicadores.extend(novos)
+                    texto_modelo = texto_modelo or texto_gerado # Keep the first suspicious continuation
+                    self._post_ui(self._append_validation_result, list(indicadores))
             
             # Schedule UI update back on the main thread
-            self.root.after(0, self._update_validation_ui, texto_modelo, indicadores, None)
+            self._post_ui(self._update_validation_ui, texto_modelo, indicadores, None)
         except Exception as e:
             # Schedule error display back on the main thread
-            self.root.after(0, self._update_validation_ui, None, None, e)
+            self._post_ui(self._update_validation_ui, None, None, e)
+
+    def _append_validation_result(self, indicadores):
+        """Mostra na barra de status os indicadores encontrados até agora, enquanto a validação continua."""
+        self.label_status.config(text="Validando... Possível dado pessoal detectado até agora: " + ", ".join(indicadores))
 
     def _update_validation_ui(self, texto_modelo, indicadores, error):
         self._set_ui_busy(False) # Re-enable UI
@@ -290,37 +431,81 @@ class PDFAnonymizerApp:
 
         self._set_ui_busy(True)
         self.label_status.config(text="Validando anonimização (carregando modelo e processando)... Por favor, aguarde.")
-        self.root.update_idletasks()
 
         # Create and start the validation thread
         self.validation_thread = threading.Thread(target=self._perform_validation, daemon=True)
         self.validation_thread.start()
     
+    def _invalidate_reversao(self):
+        self._mapeamento_reversao = None
+        self._mapeamento_inverso = None
+        self._reversor = None
+
+    def _prepare_reversao(self, mapping):
+        """Calcula o mapeamento inverso para `mapping`, reaproveitando o anterior se o mapeamento não mudou."""
+        if mapping is not self._mapeamento_reversao:
+            self._mapeamento_inverso = {falso: orig for orig, falso in mapping.items()}
+            self._reversor = None # Built lazily, the parallel path builds its own in each worker
+            self._mapeamento_reversao = mapping
+        return self._mapeamento_inverso
+
+    def _use_mapeamento_inverso(self, mapeamento_inverso):
+        """Usa um mapeamento inverso já pronto (ex.: lido de arquivo) nas próximas reversões."""
+        self._mapeamento_reversao = None
+        self._mapeamento_inverso = mapeamento_inverso
+        self._reversor = None
+
+    def _revert_pages(self, pages, mapping=None):
+        """Substitui os valores falsos pelos originais em cada página.
+        Sem `mapping`, usa o mapeamento inverso já preparado.
+        Documentos grandes são divididos entre processos; os pequenos são revertidos em série."""
+        mapeamento_inverso = self._prepare_reversao(mapping) if mapping is not None else self._mapeamento_inverso
+        pages = list(pages)
+        if len(pages) < MIN_PAGINAS_REVERSAO_PARALELA:
+            if self._reversor is None:
+                self._reversor = build_replacer(mapeamento_inverso)
+            reversor = self._reversor
+            return [reversor(pagina) for pagina in pages]
+        # Não mais processos do que páginas; "spawn" porque fork copiaria um processo com threads do Tk
+        workers = min(os.cpu_count() or 1, len(pages))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=init_revert_worker, initargs=(mapeamento_inverso,)) as pool:
+            return list(pool.map(revert_one_page, pages, chunksize=max(1, len(pages) // (workers * 4))))
+
     def reverter_sessao(self): # Renamed from reverter
         """Reverte a anonimização da sessão atual, usando o mapeamento em memória."""
         if not self.texto_paginas_anon or not self.mapeamento:
             messagebox.showerror("Erro de Reversão", "Nenhuma anonimização na sessão atual para reverter.")
             return
-        
-        # Constrói o texto deanonimizado usando o mapeamento (substituindo falsos -> originais)
-        texto_paginas_restaurado = []
-        mapeamento_inverso = {falso: orig for orig, falso in self.mapeamento.items()}
-        chaves_falsas = sorted(mapeamento_inverso.keys(), key=len, reverse=True)
-
-        for texto_anon_pagina in self.texto_paginas_anon: # Iterate through pages
-            texto_restaurado_pagina = texto_anon_pagina
-            for falso in chaves_falsas:
-                original = mapeamento_inverso[falso]
-                texto_restaurado_pagina = texto_restaurado_pagina.replace(falso, original)
-            texto_paginas_restaurado.append(texto_restaurado_pagina)
-        
-        self._update_preview(self.text_original_preview, "\n".join(self.texto_paginas_original or []))
-        self._update_preview(self.text_anon_preview, "\n".join(texto_paginas_restaurado)) # Show reverted in anon preview
 
-        texto_original_completo = "\n".join(self.texto_paginas_original) if self.texto_paginas_original else ""
-        texto_restaurado_completo = "\n".join(texto_paginas_restaurado)
+        self._set_ui_busy(True)
+        self.label_status.config(text="Revertendo a sessão... Por favor, aguarde.")
+        threading.Thread(target=self._perform_reversao_sessao, daemon=True).start()
+
+    def _perform_reversao_sessao(self):
+        try:
+            # Constrói o texto deanonimizado usando o mapeamento (substituindo falsos -> originais)
+            texto_paginas_restaurado = self._revert_pages(self.texto_paginas_anon, self.mapeamento)
+            self._post_ui(self._update_reversao_sessao_ui, texto_paginas_restaurado, None)
+        except Exception as e:
+            self._post_ui(self._update_reversao_sessao_ui, None, e)
+
+    def _update_reversao_sessao_ui(self, texto_paginas_restaurado, error):
+        self._set_ui_busy(False)
+        if error:
+            messagebox.showerror("Erro de Reversão", f"Falha ao reverter a sessão:\n{error}")
+            self.label_status.config(text="Falha na reversão da sessão.")
+            return
+
+        self._update_preview_pages(self.text_original_preview, self.texto_paginas_original or [])
+        self._update_preview_pages(self.text_anon_preview, texto_paginas_restaurado) # Show reverted in anon preview
 
-        if self.texto_paginas_original and texto_restaurado_completo == texto_original_completo:
+        # Page-by-page comparison: stops at the first difference and never builds the full document
+        restaurado_integralmente = (bool(self.texto_paginas_original)
+                                    and len(self.texto_paginas_original) == len(texto_paginas_restaurado)
+                                    and all(a == b for a, b in zip(self.texto_paginas_original, texto_paginas_restaurado)))
+
+        if restaurado_integralmente:
             messagebox.showinfo("Reversão da Sessão", "Reversão bem-sucedida! O texto original foi restaurado integralmente na visualização.")
         else:
             messagebox.showinfo(
@@ -355,42 +540,53 @@ class PDFAnonymizerApp:
             self._update_log_area(None) # Clear log
             return
 
+        self._set_ui_busy(True)
+        self.label_status.config(text="Carregando e revertendo... Por favor, aguarde.")
+        threading.Thread(target=self._processar_reversao_thread,
+                         args=(caminho_pdf_anon, caminho_mapeamento),
+                         daemon=True).start()
+
+    @_handle_pdf_errors("reversão", "_erro_reversao")
+    def _processar_reversao_thread(self, caminho_pdf_anon, caminho_mapeamento):
+        """Carrega o PDF e o mapeamento e reverte fora da thread da interface."""
+        texto_paginas_anon_carregado = extrair_texto(caminho_pdf_anon)
+        # Parsed straight into the inverse mapping; large files are streamed
+        mapeamento_inverso = load_inverse_mapping(caminho_mapeamento)
+
+        if not texto_paginas_anon_carregado: # extrair_texto might return empty list or raise error
+            # Empty without error; exceptions are handled by _handle_pdf_errors
+            self._post_ui(self._erro_reversao, "Erro de Carga",
+                          f"Não foi possível extrair texto de: {os.path.basename(caminho_pdf_anon)}. O arquivo pode estar vazio ou ilegível.",
+                          "Erro ao carregar PDF anonimizado.")
+            return
+        if not mapeamento_inverso: # load_inverse_mapping returns None on error
+            # Error message for this is handled by the specific exceptions below if they occurred,
+            # or a general one if it just returned None for other reasons.
+            self._post_ui(self._erro_reversao, "Erro de Carga",
+                          f"Não foi possível carregar o mapeamento de: {os.path.basename(caminho_mapeamento)}. Verifique o console para detalhes.",
+                          "Erro ao carregar mapeamento.")
+            return
+        # Reversão
+        self._use_mapeamento_inverso(mapeamento_inverso)
+        texto_paginas_restaurado = self._revert_pages(texto_paginas_anon_carregado)
+        self._post_ui(self._finalizar_reversao, texto_paginas_anon_carregado,
+                      texto_paginas_restaurado, mapeamento_inverso)
+
+    def _erro_reversao(self, titulo, mensagem, status):
+        """Exibe um erro da reversão na thread principal."""
+        self._set_ui_busy(False)
+        messagebox.showerror(titulo, mensagem)
+        self.label_status.config(text=status)
+        self._update_log_area(None) # Clear log as state is uncertain
+
+    def _finalizar_reversao(self, texto_paginas_anon_carregado, texto_paginas_restaurado, mapeamento_inverso):
+        """Atualiza a interface com o resultado da reversão e oferece salvar o texto revertido."""
+        self._set_ui_busy(False)
         try:
-            self.label_status.config(text="Carregando e revertendo...")
-            self.root.update_idletasks()
-
-            texto_paginas_anon_carregado = extrair_texto(caminho_pdf_anon)
-            mapeamento_carregado = load_mapping(caminho_mapeamento)
-
-            if not texto_paginas_anon_carregado: # extrair_texto might return empty list or raise error
-                # This case is if extrair_texto returns empty without error, actual error caught below
-                messagebox.showerror("Erro de Carga", f"Não foi possível extrair texto de: {os.path.basename(caminho_pdf_anon)}. O arquivo pode estar vazio ou ilegível.")
-                self.label_status.config(text="Erro ao carregar PDF anonimizado.")
-                self._update_log_area(None)
-                return
-            if not mapeamento_carregado: # load_mapping returns None on error
-                # Error message for this is handled by the specific exceptions below if they occurred,
-                # or a general one if it just returned None for other reasons.
-                messagebox.showerror("Erro de Carga", f"Não foi possível carregar o mapeamento de: {os.path.basename(caminho_mapeamento)}. Verifique o console para detalhes.")
-                self.label_status.config(text="Erro ao carregar mapeamento.")
-                self._update_log_area(None)
-                return
-            # Reversão
-            texto_paginas_restaurado = []
-            mapeamento_inverso = {falso: orig for orig, falso in mapeamento_carregado.items()}
-            chaves_falsas = sorted(mapeamento_inverso.keys(), key=len, reverse=True)
-
-            for texto_anon_pagina in texto_paginas_anon_carregado:
-                texto_restaurado_pagina = texto_anon_pagina
-                for falso in chaves_falsas:
-                    original = mapeamento_inverso[falso]
-                    texto_restaurado_pagina = texto_restaurado_pagina.replace(falso, original)
-                texto_paginas_restaurado.append(texto_restaurado_pagina)
-            
             # Display reverted text in the "anonymized" preview area for simplicity
-            self._update_preview(self.text_original_preview, "\n".join(texto_paginas_anon_carregado)) # Show loaded anon text
-            self._update_preview(self.text_anon_preview, "\n".join(texto_paginas_restaurado)) # Show reverted text
-            self._update_log_area(mapeamento_carregado) # Show the loaded mapping
+            self._update_preview_pages(self.text_original_preview, texto_paginas_anon_carregado) # Show loaded anon text
+            self._update_preview_pages(self.text_anon_preview, texto_paginas_restaurado) # Show reverted text
+            self._update_log_area(mapeamento_inverso, inverso=True) # Show the loaded mapping
 
             self.label_status.config(text="Reversão a partir de arquivos concluída.")
             
@@ -406,8 +602,11 @@ class PDFAnonymizerApp:
                         salvar_pdf_anon(texto_paginas_restaurado, caminho_salvar_revertido) # Re-using salvar_pdf_anon
                         messagebox.showinfo("Sucesso", f"PDF revertido salvo em: {os.path.basename(caminho_salvar_revertido)}")
                     else: # Save as .txt
-                        with open(caminho_salvar_revertido, "w", encoding="utf-8") as f:
-                            f.write("\n".join(texto_paginas_restaurado))
+                        # Streamed page by page through a 1 MiB buffer instead of joining the whole document
+                        with open(caminho_salvar_revertido, "w", encoding="utf-8", buffering=1 << 20) as f:
+                            paginas = iter(texto_paginas_restaurado)
+                            f.write(next(paginas, ""))
+                            f.writelines("\n" + pagina for pagina in paginas)
                         messagebox.showinfo("Sucesso", f"Texto revertido salvo em: {os.path.basename(caminho_salvar_revertido)}")
                     self.label_status.config(text=f"Texto revertido salvo em: {os.path.basename(caminho_salvar_revertido)}")
                 else:
@@ -415,26 +614,12 @@ class PDFAnonymizerApp:
             else:
                 messagebox.showinfo("Reversão", "Texto revertido carregado para visualização.")
 
-        except FileNotFoundError as e:
-            messagebox.showerror("Erro de Arquivo", f"Arquivo não encontrado durante a reversão:\\n{e}")
-            self.label_status.config(text="Erro na reversão: Arquivo não encontrado.")
-            self._update_log_area(None)
-        except fitz.fitz.FZ_ERROR_GENERIC as e: # From extrair_texto
-            messagebox.showerror("Erro de PDF", f"Erro ao ler o arquivo PDF anonimizado (pode estar corrompido):\\n{e}")
-            self.label_status.config(text="Erro na reversão: Falha ao ler PDF.")
-            self._update_log_area(None)
-        except json.JSONDecodeError as e: # From load_mapping
-            messagebox.showerror("Erro de Mapeamento", f"Erro ao decodificar o arquivo de mapeamento (JSON inválido):\\n{e}")
-            self.label_status.config(text="Erro na reversão: JSON de mapeamento inválido.")
-            self._update_log_area(None)
-        except IOError as e: # From load_mapping or salvar_pdf_anon (if saving reverted)
-            messagebox.showerror("Erro de Arquivo", f"Erro de I/O durante a reversão (leitura/escrita):\\n{e}")
+        except IOError as e: # From salvar_pdf_anon or the .txt write
+            messagebox.showerror("Erro de Arquivo", f"Erro de I/O durante a reversão (leitura/escrita):\n{e}")
             self.label_status.config(text="Erro na reversão: Falha de I/O.")
-            self._update_log_area(None) # Clear log as state is uncertain
         except Exception as e:
-            messagebox.showerror("Erro na Reversão", f"Ocorreu uma falha inesperada durante a reversão a partir de arquivos:\\n{e}")
+            messagebox.showerror("Erro na Reversão", f"Ocorreu uma falha inesperada ao salvar a reversão:\n{e}")
             self.label_status.config(text="Erro na reversão.")
-            self._update_log_area(None)
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -1,22 +1,62 @@
 '''Module for detecting sensitive data using spaCy and regex.'''
+import functools
+import os
 import re
-import spacy
-
-# Load the Portuguese spaCy model
-# Make sure to download it first: python -m spacy download pt_core_news_sm
-try:
-    nlp = spacy.load("pt_core_news_sm")
-except OSError:
-    print("spaCy model 'pt_core_news_sm' not found. Please download it by running:")
-    print("python -m spacy download pt_core_news_sm")
-    # Fallback or raise an error if the model is critical for the module's function
-    nlp = None 
+from dataclasses import dataclass, field
+
+# Only doc.ents is used, so everything except tok2vec + ner is left out of the pipeline
+SPACY_EXCLUDE = ["lemmatizer", "attribute_ruler", "tagger", "parser", "morphologizer", "senter"]
+
+@functools.lru_cache(maxsize=1)
+def _get_nlp():
+    """
+    Loads the Portuguese spaCy model on first use and reuses it afterwards.
+
+    spaCy itself is imported here too, so importing this module for the regex-only
+    helpers stays cheap. Tests can reset it with _get_nlp.cache_clear().
+
+    Returns:
+        The loaded pipeline, or None if the model is not installed.
+    """
+    import spacy
+    # Make sure to download it first: python -m spacy download pt_core_news_sm
+    try:
+        return spacy.load("pt_core_news_sm", exclude=SPACY_EXCLUDE)
+    except OSError:
+        print("spaCy model 'pt_core_news_sm' not found. Please download it by running:")
+        print("python -m spacy download pt_core_news_sm")
+        # Fallback or raise an error if the model is critical for the module's function
+        return None
+
+# Number of texts spaCy processes per batch in nlp.pipe; override with ANONIMATIZACAO_SPACY_BATCH_SIZE
+SPACY_BATCH_SIZE = int(os.environ.get("ANONIMATIZACAO_SPACY_BATCH_SIZE", "32"))
+# Worker processes for nlp.pipe; 0 picks them from the number of texts. Override with ANONIMATIZACAO_SPACY_N_PROCESS
+SPACY_N_PROCESS = int(os.environ.get("ANONIMATIZACAO_SPACY_N_PROCESS", "0"))
+# Texts per extra process below which starting worker processes costs more than it saves
+TEXTS_PER_PROCESS = 32
+
+def _choose_nproc(n_texts: int) -> int:
+    """Number of processes for nlp.pipe: one per TEXTS_PER_PROCESS texts, leaving a core free."""
+    if SPACY_N_PROCESS > 0:
+        return SPACY_N_PROCESS
+    return max(1, min((os.cpu_count() or 1) - 1, n_texts // TEXTS_PER_PROCESS))
 
 # Regular expressions for PII
-CPF_REGEX = r"\d{3}\.?\d{3}\.?\d{3}-?\d{2}"
-PHONE_REGEX = r"(\+?55\s?)?(\(?\d{2}\)?\s?)\d{4,5}-?\d{4}"
+# Fenced so they never match inside a longer run of digits (tables of IDs, page numbers).
+# PHONE uses a lookbehind instead of \b because it may start with "+" or "(".
+CPF_REGEX = r"\b\d{3}\.?\d{3}\.?\d{3}-?\d{2}\b"
+PHONE_REGEX = r"(?<!\w)(?:\+?55\s?)?\(?\d{2}\)?\s?\d{4,5}-?\d{4}\b"
 EMAIL_REGEX = r"\b[\w\.-]+@[\w\.-]+\.\w{2,4}\b"
 
+# Compiled once at import. Digit-only patterns use re.ASCII so \d and \s skip the Unicode classes;
+# e-mail keeps Unicode \w to accept accented local parts.
+PADRAO_CPF = re.compile(CPF_REGEX, re.ASCII)
+PADRAO_TELEFONE = re.compile(PHONE_REGEX, re.ASCII)
+PADRAO_EMAIL = re.compile(EMAIL_REGEX)
+# All three in one alternation so each text is scanned once; the kind comes from match.lastgroup.
+# CPF is tried first, so an 11-digit number is classified as CPF rather than PHONE.
+PADRAO_PII = re.compile(f"(?P<CPF>(?a:{CPF_REGEX}))|(?P<PHONE>(?a:{PHONE_REGEX}))|(?P<EMAIL>{EMAIL_REGEX})")
+
 # Define PII types for clarity
 PII_TYPES = {
     "CPF": "CPF",
@@ -27,111 +67,134 @@ PII_TYPES = {
     "ORGANIZACAO": "ORG", # spaCy's ORG (Organization)
     "MISC": "MISC" # spaCy's MISC (Miscellaneous)
 }
+# Remove os separadores de CPF em uma passada em C (str.translate), sem passar pelo motor de regex
+_SEPARADORES_CPF = str.maketrans("", "", ".-")
 
-def detect_sensitive_data(text: str) -> list[dict[str, str]]:
-    """
-    Detects sensitive data (PII) in a given text using spaCy NER and regular expressions.
+# PADRAO_PII group name -> PII type reported by detect_sensitive_data
+REGEX_PII_TYPES = {"CPF": PII_TYPES["CPF"], "PHONE": PII_TYPES["TELEFONE"], "EMAIL": PII_TYPES["EMAIL"]}
 
-    Args:
-        text: The input text to analyze.
+@dataclass(slots=True)
+class DetectedItems:
+    """Detected items stored as parallel lists: texts[i] was classified as types[i]."""
+    texts: list[str] = field(default_factory=list)
+    types: list[str] = field(default_factory=list)
 
-    Returns:
-        A list of dictionaries, where each dictionary represents a detected sensitive item
-        and contains 'text' (the detected string) and 'type' (the PII type).
-        Returns an empty list if no sensitive data is found or if nlp model is not loaded.
-    """
-    if nlp is None:
-        print("spaCy model not loaded. Cannot perform NER.")
-        return []
+    def append(self, text: str, pii_type: str):
+        self.texts.append(text)
+        self.types.append(pii_type)
 
-    detected_items = []
-    processed_texts = set() # To avoid duplicate entries of the exact same text span
+    def __len__(self):
+        return len(self.texts)
 
-    # 1. Named Entity Recognition (NER) with spaCy
-    doc = nlp(text)
-    for ent in doc.ents:
-        if ent.label_ in ["PER", "LOC", "ORG", "MISC"]:
-            # Ensure we don't add empty or whitespace-only entities
-            if ent.text.strip() and ent.text not in processed_texts:
-                detected_items.append({"text": ent.text, "type": PII_TYPES.get(ent.label_, ent.label_)})
-                processed_texts.add(ent.text)
-
-    # 2. Regular Expressions for PII
-    # CPF
-    for match in re.finditer(CPF_REGEX, text):
-        cpf = match.group(0)
-        if cpf not in processed_texts:
-            detected_items.append({"text": cpf, "type": PII_TYPES["CPF"]})
-            processed_texts.add(cpf)
-            
-    # Telefones
-    for match in re.finditer(PHONE_REGEX, text):
-        phone = match.group(0)
-        if phone not in processed_texts:
-            detected_items.append({"text": phone, "type": PII_TYPES["TELEFONE"]})
-            processed_texts.add(phone)
-
-    # E-mails
-    for match in re.finditer(EMAIL_REGEX, text):
-        email = match.group(0)
-        if email not in processed_texts:
-            detected_items.append({"text": email, "type": PII_TYPES["EMAIL"]})
-            processed_texts.add(email)
-            
-    # 3. Unification of Results (handled by processed_texts set for basic deduplication)
-    # More sophisticated deduplication might be needed if spaCy and regex overlap
-    # e.g. spaCy identifies "email@example.com" as MISC and regex identifies it as EMAIL.
-    # For now, we accept both if their text representation is slightly different or if one is a substring of another.
-    # A more robust approach would be to check for overlapping spans.
-
-    # A simple way to further remove duplicates that might have different types but same text
-    final_detected_items = []
-    seen_texts_for_final_list = set()
-    for item in detected_items:
-        if item["text"] not in seen_texts_for_final_list:
-            final_detected_items.append(item)
-            seen_texts_for_final_list.add(item["text"])
-            
-    return final_detected_items
+    def __iter__(self):
+        """Iterating (or list()) still yields the former {"text", "type"} dicts, built on demand."""
+        for text, pii_type in zip(self.texts, self.types):
+            yield {"text": text, "type": pii_type}
 
-def encontrar_dados_sensiveis(textos_paginas: list):
-    """Retorna um dicionário de dados sensíveis encontrados mapeando o texto original para sua categoria."""
+    def __getitem__(self, index: int) -> dict:
+        return {"text": self.texts[index], "type": self.types[index]}
+
+def regex_scan_page(texto: str) -> dict:
+    """Aplica só as expressões regulares (CPF, telefone, e-mail) a uma página.
+    Não depende do spaCy, então pode ser executada em processos separados."""
+    return {match.group(): match.lastgroup for match in PADRAO_PII.finditer(texto)}
+
+def precisa_ner(texto: str, regex_hits: dict) -> bool:
+    """Indica se a página deve passar pelo NER: tem achados de regex ou alguma letra maiúscula
+    (nomes, locais e organizações começam com maiúscula)."""
+    return bool(regex_hits) or texto != texto.lower()
+
+def _detect_raw(textos_paginas: list, regex_hits: list = None):
+    """Executa o NER e as regex uma única vez sobre as páginas.
+    Retorna (entidades, regex_hits): os pares (texto, rótulo do spaCy) na ordem do documento
+    e, por página, o dicionário de regex_scan_page. Os formatos públicos são montados a partir daqui."""
+    if regex_hits is None:
+        regex_hits = [regex_scan_page(texto) for texto in textos_paginas]
+    entidades = []
+    nlp = _get_nlp()
+    if nlp is not None:
+        # NER só nas páginas que podem conter entidades, em lotes via nlp.pipe
+        indices = [i for i, (texto, hits) in enumerate(zip(textos_paginas, regex_hits)) if precisa_ner(texto, hits)]
+        for doc in nlp.pipe((textos_paginas[i] for i in indices), batch_size=SPACY_BATCH_SIZE,
+                            n_process=_choose_nproc(len(indices))):
+            entidades.extend((ent.text, ent.label_) for ent in doc.ents)
+    return entidades, regex_hits
+
+def _as_detected_items(entidades: list, regex_hits: list) -> DetectedItems:
+    """Formato de detect_sensitive_data: o primeiro tipo encontrado para cada texto prevalece."""
+    detected_items = DetectedItems()
+    processed_texts = set() # To avoid duplicate entries of the exact same text span
+    for ent_text, label in entidades:
+        # Ensure we don't add empty or whitespace-only entities
+        if label in ("PER", "LOC", "ORG", "MISC") and ent_text.strip() and ent_text not in processed_texts:
+            detected_items.append(ent_text, PII_TYPES.get(label, label))
+            processed_texts.add(ent_text)
+    for hits in regex_hits:
+        for found, kind in hits.items():
+            if found not in processed_texts:
+                detected_items.append(found, REGEX_PII_TYPES[kind])
+                processed_texts.add(found)
+    # Overlapping spans between spaCy and regex (e.g. an e-mail tagged MISC) are still kept as separate texts
+    return detected_items
+
+def _as_dict(entidades: list, regex_hits: list) -> dict:
+    """Formato de encontrar_dados_sensiveis: {texto: categoria}, com as regex prevalecendo sobre o NER."""
     encontrados = {}  # mapeia string sensível -> categoria
-    # Verifica cada página separadamente para considerar quebra de página
-    for texto in textos_paginas:
-        # 1. Named Entity Recognition (spaCy)
-        doc = nlp(texto)
-        for ent in doc.ents:
-            label = ent.label_
-            # Considera apenas entidades de interesse: pessoas, locais e organizações
-            if label in ("PERSON", "PER"):
-                encontrados[ent.text] = "PERSON"
-            elif label in ("ORG",):
-                encontrados[ent.text] = "ORG"
-            elif label in ("GPE", "LOC"):
-                encontrados[ent.text] = "LOC"
-        # 2. Regex para CPF
-        for match in re.finditer(CPF_REGEX, texto):
-            cpf = match.group()
-            encontrados[cpf] = "CPF"
-        # 3. Regex para telefones
-        for match in re.finditer(PHONE_REGEX, texto):
-            tel = match.group()
-            encontrados[tel] = "PHONE"
-        # 4. Regex para e-mails
-        for match in re.finditer(EMAIL_REGEX, texto):
-            email = match.group()
-            encontrados[email] = "EMAIL"
+    for ent_text, label in entidades:
+        # Considera apenas entidades de interesse: pessoas, locais e organizações
+        if label in ("PERSON", "PER"):
+            encontrados[ent_text] = "PERSON"
+        elif label in ("ORG",):
+            encontrados[ent_text] = "ORG"
+        elif label in ("GPE", "LOC"):
+            encontrados[ent_text] = "LOC"
+    # Regex para CPF, telefones e e-mails
+    for hits in regex_hits:
+        encontrados.update(hits)
     # Resolver potenciais duplicatas entre CPF e PHONE (11 dígitos não formatados)
     duplicados = []
     for dado, categoria in encontrados.items():
-        if categoria == "PHONE" and PADRAO_CPF.fullmatch(dado):
-            # Se foi classificado como PHONE mas corresponde exatamente a um CPF (11 dígitos), marca para ajustar
-            duplicados.append(dado)
+        if categoria == "PHONE":
+            # Sem os separadores de CPF ("." e "-"), 11 dígitos puros indicam um CPF classificado como PHONE
+            digitos = dado.translate(_SEPARADORES_CPF)
+            if len(digitos) == 11 and digitos.isdigit():
+                duplicados.append(dado)
     for dado in duplicados:
         encontrados[dado] = "CPF"
     return encontrados
 
+def detect_sensitive_data(text) -> DetectedItems:
+    """
+    Detects sensitive data (PII) in a given text using spaCy NER and regular expressions.
+
+    Args:
+        text: The input text to analyze, or a list of page texts. Pages are fed to spaCy
+            together through nlp.pipe.
+
+    Returns:
+        A DetectedItems with the detected strings in `texts` and their PII types in the
+        parallel `types` list. Iterating or indexing it gives the former
+        {"text": ..., "type": ...} dicts. It is empty if no sensitive data is found or if
+        the nlp model is not loaded.
+    """
+    if _get_nlp() is None:
+        print("spaCy model not loaded. Cannot perform NER.")
+        return DetectedItems()
+    texts = [text] if isinstance(text, str) else list(text)
+    return _as_detected_items(*_detect_raw(texts))
+
+def encontrar_dados_sensiveis(textos_paginas: list, regex_hits: list = None):
+    """Retorna um dicionário de dados sensíveis encontrados mapeando o texto original para sua categoria.
+    `regex_hits` permite reaproveitar o resultado de regex_scan_page já calculado para cada página
+    (por exemplo, em paralelo); sem ele, as regex são aplicadas aqui mesmo."""
+    # Verifica cada página separadamente para considerar quebra de página
+    return _as_dict(*_detect_raw(textos_paginas, regex_hits))
+
+def warmup():
+    """Executa a detecção uma vez sobre um texto curto, para que o primeiro documento real
+    não pague a inicialização preguiçosa do spaCy nem a primeira passagem pelas regex."""
+    encontrar_dados_sensiveis(["Aquecimento: 000.000.000-00, (00) 00000-0000, a@b.com"])
+
 # Example usage (optional, for testing the module directly)
 if __name__ == '__main__':
     sample_text_pt = """
@@ -145,12 +208,13 @@ if __name__ == '__main__':
     """
 
     print("Attempting to detect sensitive data in sample text...")
+    nlp = _get_nlp()
     if nlp: # Proceed only if spaCy model was loaded
         sensitive_data_found = detect_sensitive_data(sample_text_pt)
         if sensitive_data_found:
             print("\nDetected Sensitive Data:")
-            for item in sensitive_data_found:
-                print(f'- Text: "{item['text']}", Type: {item['type']}')
+            for item_text, item_type in zip(sensitive_data_found.texts, sensitive_data_found.types):
+                print(f'- Text: "{item_text}", Type: {item_type}')
         else:
             print("No sensitive data detected in the sample text.")
     else:
@@ -163,8 +227,8 @@ if __name__ == '__main__':
         sensitive_data_regex_only = detect_sensitive_data(sample_text_regex_only)
         if sensitive_data_regex_only:
             print("\nDetected Sensitive Data (Regex Only):")
-            for item in sensitive_data_regex_only:
-                print(f'- Text: "{item['text']}", Type: {item['type']}')
+            for item_text, item_type in zip(sensitive_data_regex_only.texts, sensitive_data_regex_only.types):
+                print(f'- Text: "{item_text}", Type: {item_type}')
         else:
             print("No sensitive data detected in the regex-only sample text.")
             
@@ -174,7 +238,7 @@ if __name__ == '__main__':
         sensitive_data_empty = detect_sensitive_data("")
         if sensitive_data_empty:
             print("\nDetected Sensitive Data (Empty Text - should be none):")
-            for item in sensitive_data_empty:
-                print(f'- Text: "{item['text']}", Type: {item['type']}')
+            for item_text, item_type in zip(sensitive_data_empty.texts, sensitive_data_empty.types):
+                print(f'- Text: "{item_text}", Type: {item_type}')
         else:
             print("No sensitive data detected in empty text, as expected.")
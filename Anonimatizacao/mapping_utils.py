@@ -1,5 +1,44 @@
 import json
 import os
+import re
+
+try:
+    import ahocorasick # pyahocorasick, optional: multi-pattern reversion in linear time
+except ImportError:
+    ahocorasick = None
+
+try:
+    import orjson # optional: faster JSON encoding/decoding of mapping files
+except ImportError:
+    orjson = None
+
+try:
+    import ijson # optional: incremental parsing of large mapping files
+except ImportError:
+    ijson = None
+
+# Mapping files larger than this are parsed incrementally with ijson (when installed)
+STREAMING_THRESHOLD_BYTES = 5 * 1024 * 1024
+
+_JSON_ERRORS = (json.JSONDecodeError, ijson.JSONError) if ijson is not None else (json.JSONDecodeError,)
+
+def _write_json(mapping: dict, path: str):
+    """Writes the mapping as UTF-8 JSON, with orjson when it is installed."""
+    if orjson is not None:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(mapping, option=orjson.OPT_INDENT_2))
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(mapping, f, ensure_ascii=False, indent=4)
+
+def _read_json(path: str):
+    """Reads a JSON file, with orjson when it is installed.
+    orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch the same exception."""
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
 
 def save_mapping(mapping: dict, original_pdf_path: str, suffix: str = "_mapping.json") -> str:
     """Saves the mapping dictionary to a JSON file in the same directory as the original PDF.
@@ -16,8 +55,7 @@ def save_mapping(mapping: dict, original_pdf_path: str, suffix: str = "_mapping.
     base_name = os.path.splitext(original_pdf_path)[0]
     mapping_file_path = base_name + suffix
     try:
-        with open(mapping_file_path, 'w', encoding='utf-8') as f:
-            json.dump(mapping, f, ensure_ascii=False, indent=4)
+        _write_json(mapping, mapping_file_path)
         return mapping_file_path
     except IOError as e:
         # Handle potential errors during file writing
@@ -34,9 +72,7 @@ def load_mapping(mapping_file_path: str) -> dict | None:
         The loaded mapping dictionary, or None if an error occurs.
     """
     try:
-        with open(mapping_file_path, 'r', encoding='utf-8') as f:
-            mapping = json.load(f)
-        return mapping
+        return _read_json(mapping_file_path)
     except FileNotFoundError:
         print(f"Mapping file not found: {mapping_file_path}")
         return None
@@ -47,6 +83,109 @@ def load_mapping(mapping_file_path: str) -> dict | None:
         print(f"Error loading mapping file {mapping_file_path}: {e}")
         return None
 
+def iter_mapping_items(mapping_file_path: str):
+    """Yields the (original_value, fake_value) pairs of a mapping JSON file.
+
+    Files above STREAMING_THRESHOLD_BYTES are parsed incrementally with ijson, so the
+    pairs can be consumed without materializing the whole mapping dictionary first.
+
+    Args:
+        mapping_file_path: Path to the mapping JSON file.
+
+    Raises:
+        FileNotFoundError, IOError or a JSON decoding error, like json.load.
+    """
+    if ijson is not None and os.path.getsize(mapping_file_path) > STREAMING_THRESHOLD_BYTES:
+        with open(mapping_file_path, 'rb') as f:
+            yield from ijson.kvitems(f, '')
+    else:
+        yield from _read_json(mapping_file_path).items()
+
+def load_inverse_mapping(mapping_file_path: str) -> dict | None:
+    """Loads a mapping JSON file directly as its inverse, without building the forward mapping.
+
+    Args:
+        mapping_file_path: Path to the mapping JSON file.
+
+    Returns:
+        The inverse mapping (fake_value: original_value), or None if an error occurs.
+    """
+    try:
+        return {fake: original for original, fake in iter_mapping_items(mapping_file_path)}
+    except FileNotFoundError:
+        print(f"Mapping file not found: {mapping_file_path}")
+        return None
+    except _JSON_ERRORS as e:
+        print(f"Error decoding JSON from mapping file {mapping_file_path}: {e}")
+        return None
+    except IOError as e:
+        print(f"Error loading mapping file {mapping_file_path}: {e}")
+        return None
+
+def build_replacer(substituicoes: dict):
+    """Builds a function that replaces every searched value in a page with its replacement.
+
+    Used in both directions: with the mapping itself (original_value: fake_value) it
+    anonymizes, with the inverse mapping (fake_value: original_value) it reverts.
+
+    When every searched value is a single character (e.g. masked initials or digits), the page
+    is handled with str.translate, which does the whole replacement in C. Otherwise uses an
+    Aho-Corasick automaton when pyahocorasick is available, or a single compiled regex
+    alternation. Both pick the leftmost, longest searched value at each position.
+
+    Args:
+        substituicoes: Dictionary of searched_value: replacement.
+
+    Returns:
+        A callable taking a page text and returning the page with the replacements applied.
+    """
+    if not substituicoes:
+        return lambda pagina: pagina
+    if all(len(procurado) == 1 for procurado in substituicoes):
+        # Chaves de um caractere não se sobrepõem: uma tabela de tradução basta
+        tabela = str.maketrans(substituicoes)
+        return lambda pagina: pagina.translate(tabela)
+    if ahocorasick is not None:
+        automato = ahocorasick.Automaton()
+        for procurado, substituto in substituicoes.items():
+            automato.add_word(procurado, (len(procurado), substituto))
+        automato.make_automaton()
+        return lambda pagina: _replace_automaton(pagina, automato)
+    # Alternância ordenada do maior para o menor preserva a prioridade das chaves mais longas
+    procurados = sorted(substituicoes.keys(), key=len, reverse=True)
+    pattern = re.compile("|".join(map(re.escape, procurados)))
+    return lambda pagina: pattern.sub(lambda m: substituicoes[m.group(0)], pagina)
+
+def _replace_automaton(pagina: str, automato) -> str:
+    """Applies the automaton to a page, always keeping the leftmost and longest match."""
+    ocorrencias = sorted(
+        ((fim - tamanho + 1, -tamanho, substituto) for fim, (tamanho, substituto) in automato.iter(pagina))
+    )
+    if not ocorrencias:
+        return pagina
+    partes = []
+    cursor = 0
+    for inicio, tamanho_neg, substituto in ocorrencias:
+        if inicio < cursor: # Overlaps a replacement already applied
+            continue
+        partes.append(pagina[cursor:inicio])
+        partes.append(substituto)
+        cursor = inicio - tamanho_neg
+    partes.append(pagina[cursor:])
+    return "".join(partes)
+
+# Per-process reverter used by ProcessPoolExecutor workers (built once by the initializer)
+_worker_reverter = None
+
+def init_revert_worker(mapeamento_inverso: dict):
+    """Pool initializer: builds the page reverter once per worker process."""
+    global _worker_reverter
+    _worker_reverter = build_replacer(mapeamento_inverso)
+
+def revert_one_page(pagina: str) -> str:
+    """Reverts a single page inside a worker set up by init_revert_worker."""
+    return _worker_reverter(pagina)
+
 # Example Usage (optional, for testing the module directly)
 if __name__ == '__main__':
     sample_map = {"João Silva": "Carlos Pereira", "123.456.789-00": "987.654.321-99"}
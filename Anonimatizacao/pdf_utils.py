@@ -1,28 +1,44 @@
-```python
-import fitz  # PyMuPDF
-import os
-
-def extrair_texto(caminho_pdf: str):
-    """Extrai o texto de todas as páginas do PDF especificado e retorna uma lista de strings (uma por página)."""
-    texto_paginas = []
-    with fitz.open(caminho_pdf) as doc:
-        for pagina in doc:
-            texto = pagina.get_text()  # extrai o texto bruto da página
-            # Normalização básica: remover espaços extras no início/fim
-            texto = texto.strip()
-            texto_paginas.append(texto)
-    return texto_paginas
-
-def salvar_pdf_anon(texto_paginas_anonimizado: list, caminho_pdf_original: str):
-    """Gera um PDF novo com o texto anonimizado. Retorna o caminho do arquivo PDF salvo."""
-    nome_base, _ = os.path.splitext(caminho_pdf_original)
-    caminho_saida = nome_base + "_anon.pdf"
-    doc = fitz.open()  # cria um novo documento PDF vazio
-    for texto in texto_paginas_anonimizado:
-        # Cria uma nova página e insere o texto anonimizado na posição (72,72) 
-        # (1 polegada de margem nas bordas) com fonte padrão.
-        pagina = doc.new_page()
-        pagina.insert_text(fitz.Point(72, 72), texto)
-    doc.save(caminho_saida)
-    return caminho_saida
-```
\ No newline at end of file
+import fitz  # PyMuPDF
+import os
+
+# Flags só de texto (sem imagens nem blocos extras); None mantém o padrão em versões antigas do PyMuPDF
+FLAGS_TEXTO = getattr(fitz, "TEXTFLAGS_TEXT", None)
+
+def iterar_texto_paginas(caminho_pdf: str):
+    """Gera o texto de cada página do PDF especificado, uma página por vez, sem carregar o documento inteiro."""
+    with fitz.open(caminho_pdf) as doc:
+        for pagina in doc:
+            texto = pagina.get_text("text", flags=FLAGS_TEXTO, sort=False)  # extrai o texto bruto da página
+            # Normalização básica: remover espaços extras no início/fim
+            yield texto.strip()
+
+def extrair_texto(caminho_pdf: str):
+    """Extrai o texto de todas as páginas do PDF especificado e retorna uma lista de strings (uma por página)."""
+    return list(iterar_texto_paginas(caminho_pdf))
+
+# Tamanhos de fonte tentados, do maior para o menor, até o texto da página caber na caixa
+TAMANHOS_FONTE = (11, 9, 7)
+
+def _inserir_texto_pagina(pagina, texto: str, margem_inferior: float = 72):
+    """Insere o texto numa caixa com margens de 1 polegada, com quebra de linha automática.
+    Se nem no menor tamanho de fonte o texto couber, insere-o a partir de (72,72) sem quebra, como antes."""
+    caixa = fitz.Rect(72, 72, pagina.rect.width - 72, pagina.rect.height - margem_inferior)
+    for tamanho in TAMANHOS_FONTE:
+        # insert_textbox não escreve nada e retorna valor negativo quando o texto não cabe
+        if pagina.insert_textbox(caixa, texto, fontsize=tamanho, fontname="helv") >= 0:
+            return
+    pagina.insert_text(fitz.Point(72, 72), texto, fontsize=TAMANHOS_FONTE[-1])
+
+def salvar_pdf_anon(texto_paginas_anonimizado: list, caminho_pdf_original: str):
+    """Gera um PDF novo com o texto anonimizado. Retorna o caminho do arquivo PDF salvo."""
+    nome_base, _ = os.path.splitext(caminho_pdf_original)
+    caminho_saida = nome_base + "_anon.pdf"
+    doc = fitz.open()  # cria um novo documento PDF vazio
+    for texto in texto_paginas_anonimizado:
+        # Cria uma nova página e insere o texto anonimizado
+        # (1 polegada de margem nas bordas), quebrando as linhas longas.
+        pagina = doc.new_page()
+        _inserir_texto_pagina(pagina, texto)
+    # Remove objetos não usados e comprime os fluxos de uma vez ao salvar
+    doc.save(caminho_saida, garbage=4, deflate=True, clean=True)
+    return caminho_saida
@@ -1,36 +1,83 @@
-```python
-import transformers
-import re
-
-# Compila novamente os mesmos padrões de identificação para reutilizar aqui
-PADRAO_CPF = re.compile(r"\b\d{3}\.?\d{3}\.?\d{3}-?\d{2}\b")
-PADRAO_EMAIL = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b")
-PADRAO_TEL = re.compile(r"\b(?:\+\d{1,3}\s?)?(?:\(?\d{2,3}\)?\s?)?\d{4,5}-?\d{4}\b")
-
-# Carrega o modelo e tokenizer do DistilGPT-2
-tokenizer = transformers.AutoTokenizer.from_pretrained("distilgpt2")
-modelo = transformers.AutoModelForCausalLM.from_pretrained("distilgpt2")
-
-def validar_anonimizacao(texto_anon: str, max_tokens_input: int = 1000, max_tokens_output: int = 50):
-    """Usa o modelo DistilGPT-2 para validar se o texto anonimizado ainda contém dados pessoais.
-       Retorna (texto_gerado, lista_indicadores_encontrados)."""
-    # Tokeniza o texto e trunca se ultrapassar o limite de tokens
-    inputs = tokenizer(texto_anon, return_tensors='pt', truncation=True, max_length=max_tokens_input)
-    input_ids = inputs['input_ids']
-    prompt_length = input_ids.shape[1]
-    # Gera continuacão de texto (máx max_tokens_output tokens gerados)
-    output_ids = modelo.generate(input_ids, max_new_tokens=max_tokens_output, do_sample=False)
-    # A saída inclui o prompt + novos tokens; ignoramos os tokens iniciais do prompt
-    generated_ids = output_ids[0][prompt_length:]
-    texto_gerado = tokenizer.decode(generated_ids, skip_special_tokens=True)
-    # Verifica padrões de dados pessoais no texto gerado
-    indicadores = []
-    if PADRAO_EMAIL.search(texto_gerado):
-        indicadores.append("email")
-    if PADRAO_CPF.search(texto_gerado):
-        indicadores.append("CPF")
-    if PADRAO_TEL.search(texto_gerado):
-        indicadores.append("telefone")
-    # (Opcional: poderíamos usar NER novamente aqui para detectar nomes próprios na saída)
-    return texto_gerado, indicadores
-```
\ No newline at end of file
+import functools
+import transformers
+import re
+
+# Compila novamente os mesmos padrões de identificação para reutilizar aqui
+PADRAO_CPF = re.compile(r"\b\d{3}\.?\d{3}\.?\d{3}-?\d{2}\b")
+PADRAO_EMAIL = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b")
+PADRAO_TEL = re.compile(r"\b(?:\+\d{1,3}\s?)?(?:\(?\d{2,3}\)?\s?)?\d{4,5}-?\d{4}\b")
+
+@functools.lru_cache(maxsize=1)
+def carregar_modelo():
+    """Carrega o modelo e tokenizer do DistilGPT-2 uma única vez e os reutiliza nas chamadas seguintes.
+       Retorna (tokenizer, modelo)."""
+    tokenizer = transformers.AutoTokenizer.from_pretrained("distilgpt2")
+    modelo = transformers.AutoModelForCausalLM.from_pretrained("distilgpt2")
+    return tokenizer, modelo
+
+# Tamanho (em caracteres) de cada janela de texto enviada ao modelo e sobreposição entre janelas vizinhas
+TAMANHO_JANELA = 2000
+SOBREPOSICAO_JANELA = 200
+
+def _janelas_texto(paginas, tamanho: int = TAMANHO_JANELA, sobreposicao: int = SOBREPOSICAO_JANELA):
+    """Percorre as páginas e gera janelas de até `tamanho` caracteres, sem montar o documento inteiro."""
+    passo = tamanho - sobreposicao
+    for pagina in paginas:
+        if not pagina:
+            continue
+        for inicio in range(0, max(len(pagina) - sobreposicao, 1), passo):
+            yield pagina[inicio:inicio + tamanho]
+
+def _indicadores(texto_gerado: str):
+    """Verifica padrões de dados pessoais no texto gerado."""
+    indicadores = []
+    if PADRAO_EMAIL.search(texto_gerado):
+        indicadores.append("email")
+    if PADRAO_CPF.search(texto_gerado):
+        indicadores.append("CPF")
+    if PADRAO_TEL.search(texto_gerado):
+        indicadores.append("telefone")
+    # (Opcional: poderíamos usar NER novamente aqui para detectar nomes próprios na saída)
+    return indicadores
+
+def executar_validacao(tokenizer, modelo, paginas_anon, max_tokens_input: int = 1000, max_tokens_output: int = 50,
+                       tamanho_lote: int = 16):
+    """Gera a continuação de cada janela do texto com o modelo já carregado, processando as janelas em lotes.
+       Produz (texto_gerado, lista_indicadores_encontrados) por janela, à medida que cada lote termina."""
+    if isinstance(paginas_anon, str):
+        paginas_anon = [paginas_anon]
+    # GPT-2 não tem token de padding; o preenchimento à esquerda mantém a continuação alinhada ao fim do prompt
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    tokenizer.padding_side = "left"
+    lote = []
+    for janela in _janelas_texto(paginas_anon):
+        lote.append(janela)
+        if len(lote) == tamanho_lote:
+            yield from _validar_lote(tokenizer, modelo, lote, max_tokens_input, max_tokens_output)
+            lote = []
+    if lote:
+        yield from _validar_lote(tokenizer, modelo, lote, max_tokens_input, max_tokens_output)
+
+def _validar_lote(tokenizer, modelo, lote, max_tokens_input, max_tokens_output):
+    # Tokeniza as janelas e trunca as que ultrapassarem o limite de tokens
+    inputs = tokenizer(lote, return_tensors='pt', padding=True, truncation=True, max_length=max_tokens_input)
+    prompt_length = inputs['input_ids'].shape[1]
+    # Gera continuacão de texto (máx max_tokens_output tokens gerados)
+    output_ids = modelo.generate(**inputs, max_new_tokens=max_tokens_output, do_sample=False,
+                                 pad_token_id=tokenizer.pad_token_id)
+    # A saída inclui o prompt + novos tokens; ignoramos os tokens iniciais do prompt
+    for texto_gerado in tokenizer.batch_decode(output_ids[:, prompt_length:], skip_special_tokens=True):
+        yield texto_gerado, _indicadores(texto_gerado)
+
+def validar_anonimizacao(paginas_anon, max_tokens_input: int = 1000, max_tokens_output: int = 50):
+    """Usa o modelo DistilGPT-2 para validar se o texto anonimizado ainda contém dados pessoais.
+       Aceita o texto completo ou um iterável de páginas.
+       Retorna (texto_gerado, lista_indicadores_encontrados)."""
+    tokenizer, modelo = carregar_modelo()
+    textos_gerados = []
+    indicadores = []
+    for texto_gerado, encontrados in executar_validacao(tokenizer, modelo, paginas_anon, max_tokens_input, max_tokens_output):
+        textos_gerados.append(texto_gerado)
+        indicadores.extend(i for i in encontrados if i not in indicadores)
+    return " ".join(textos_gerados), indicadores
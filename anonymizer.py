@@ -3,39 +3,128 @@ Improved anonymizer module with placeholder-based substitution and better valida
 """
 import re
 import logging
-from typing import List, Dict, Tuple, Any
+import functools
+from collections import Counter
+from typing import List, Dict, Tuple, Any, Callable, FrozenSet
 from faker import Faker
 
+try:
+    import ahocorasick  # Optional: single-pass multi-pattern replacement
+except ImportError:
+    ahocorasick = None
+
 # Import configurations
 from config import (
-    SUBSTITUTION_CONFIG, ENTITY_TYPES, VALIDATION_CONFIG, ERROR_MESSAGES
+    SUBSTITUTION_CONFIG, ENTITY_TYPES, VALIDATION_CONFIG
 )
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Look for obvious concatenation patterns (wordNameWord) in anonymized text
+CONCAT_RE = re.compile(r'\w[A-Z][a-z]+[A-Z]')
+
+DEFAULT_PLACEHOLDER_FORMAT = '[{entity_type}_{counter}]'
+
+# Attempts at drawing a fake value not used yet before falling back to a placeholder
+MAX_FAKE_VALUE_RETRIES = 10
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == '_'
+
+@functools.lru_cache(maxsize=32)
+def _compile_alternation(originals: Tuple[str, ...], guard_words: bool = False) -> re.Pattern:
+    """
+    Compile one alternation over the originals, which must already be ordered longest first.
+    
+    With guard_words, an alternative never starts or ends inside a word. Cached so that the
+    same mapping, processed again, is compiled once.
+    """
+    alternatives = []
+    for original in originals:
+        alternative = re.escape(original)
+        if guard_words:
+            if _is_word_char(original[0]):
+                alternative = r'(?<!\w)' + alternative
+            if _is_word_char(original[-1]):
+                alternative += r'(?!\w)'
+        alternatives.append(alternative)
+    return re.compile("|".join(alternatives))
+
+def _splits_word(text: str, start: int, end: int) -> bool:
+    """Check if text[start:end] begins or ends in the middle of a word."""
+    return ((start > 0 and _is_word_char(text[start]) and _is_word_char(text[start - 1])) or
+            (end < len(text) and _is_word_char(text[end - 1]) and _is_word_char(text[end])))
+
+def _replace_with_automaton(text: str, automaton, guard_words: bool) -> str:
+    """
+    Replace every original found by the automaton in one pass over the text.
+    
+    At each position the leftmost, longest original wins, matching the longest-first
+    order of the sequential replacement. With guard_words, matches that would split
+    a word are skipped.
+    """
+    matches = sorted(
+        (end - length + 1, -length, replacement)
+        for end, (length, replacement) in automaton.iter(text)
+    )
+    if not matches:
+        return text
+    parts = []
+    cursor = 0
+    for start, neg_length, replacement in matches:
+        end = start - neg_length
+        if start < cursor:  # Overlaps a replacement already applied
+            continue
+        if guard_words and _splits_word(text, start, end):
+            continue
+        parts.append(text[cursor:start])
+        parts.append(replacement)
+        cursor = end
+    parts.append(text[cursor:])
+    return "".join(parts)
+
+@functools.lru_cache(maxsize=8)
+def _build_replacer(items: FrozenSet[Tuple[str, str]], guard_words: bool) -> Callable[[str], str]:
+    """
+    Specialize a page-replacement function for one mapping, given as frozenset(mapping.items()).
+    
+    Uses an Aho-Corasick automaton when pyahocorasick is available, otherwise one regex
+    alternation over the originals (longest first). Cached, so anonymizing the same
+    document again reuses the built automaton or pattern.
+    """
+    mapping = dict(items)
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for original, replacement in mapping.items():
+            automaton.add_word(original, (len(original), replacement))
+        automaton.make_automaton()
+        return lambda text: _replace_with_automaton(text, automaton, guard_words)
+    pattern = _compile_alternation(tuple(sorted(mapping, key=len, reverse=True)), guard_words)
+    return lambda text: pattern.sub(lambda m: mapping[m.group(0)], text)
+
 class ImprovedAnonymizer:
     """Improved anonymizer with placeholder-based substitution and validation."""
     
     def __init__(self):
         self.faker = Faker("pt_BR")
-        self.entity_counters = {}
+        self.entity_counters = Counter()
         self.use_placeholders = SUBSTITUTION_CONFIG.get('use_placeholders', True)
-        self.placeholder_format = SUBSTITUTION_CONFIG.get('placeholder_format', '[{entity_type}_{counter}]')
+        self.placeholder_format = SUBSTITUTION_CONFIG.get('placeholder_format', DEFAULT_PLACEHOLDER_FORMAT)
         self.preserve_structure = SUBSTITUTION_CONFIG.get('preserve_structure', True)
         
     def _reset_counters(self):
         """Reset entity counters for a new anonymization session."""
-        self.entity_counters = {entity_type: 0 for entity_type in ENTITY_TYPES.values()}
+        self.entity_counters = Counter({entity_type: 0 for entity_type in ENTITY_TYPES.values()})
         
     def _get_next_placeholder(self, entity_type: str) -> str:
         """Generate the next placeholder for a given entity type."""
-        self.entity_counters[entity_type] = self.entity_counters.get(entity_type, 0) + 1
-        return self.placeholder_format.format(
-            entity_type=entity_type,
-            counter=self.entity_counters[entity_type]
-        )
+        counter = self.entity_counters[entity_type] = self.entity_counters[entity_type] + 1
+        if self.placeholder_format == DEFAULT_PLACEHOLDER_FORMAT:
+            # f-string avoids str.format's keyword dispatch on the common path
+            return f"[{entity_type}_{counter}]"
+        return self.placeholder_format.format_map({'entity_type': entity_type, 'counter': counter})
     
     def _generate_fake_value(self, entity_type: str, original_text: str) -> str:
         """Generate fake value for an entity type, clearly marked as fake."""
@@ -66,42 +155,6 @@ class ImprovedAnonymizer:
             logger.warning(f"Error generating fake value for {entity_type}: {e}")
             return "[DADO_ANONIMIZADO]"
     
-    def _get_replacement_value(self, original_text: str, entity_type: str) -> str:
-        """Get replacement value based on configuration."""
-        if self.use_placeholders:
-            return self._get_next_placeholder(entity_type)
-        else:
-            return self._generate_fake_value(entity_type, original_text)
-    
-    def _validate_replacement(self, original: str, replacement: str, text_before: str, text_after: str) -> bool:
-        """Validate that replacement doesn't break text structure."""
-        if not VALIDATION_CONFIG.get('check_token_boundaries', True):
-            return True
-            
-        # Check for concatenation issues
-        # Look for patterns like "wordReplacement" or "Replacementword"
-        context_pattern = r'\w' + re.escape(replacement) + r'|\b' + re.escape(replacement) + r'\w'
-        
-        if re.search(context_pattern, text_after):
-            logger.warning(ERROR_MESSAGES['token_boundary_error'].format(original))
-            return False
-            
-        return True
-    
-    def _perform_safe_replacement(self, text: str, original: str, replacement: str) -> str:
-        """Perform replacement with word boundary protection."""
-        # Use word boundaries for better replacement
-        pattern = r'\b' + re.escape(original) + r'\b'
-        new_text = re.sub(pattern, replacement, text)
-        
-        # Validate the replacement
-        if not self._validate_replacement(original, replacement, text, new_text):
-            # If validation fails, try a different approach
-            logger.warning(f"Replacement validation failed for '{original}', using exact match")
-            new_text = text.replace(original, replacement)
-        
-        return new_text
-    
     def anonymize_texts(self, textos_paginas: List[str], itens_sensiveis: Dict[str, str]) -> Tuple[List[str], Dict[str, str]]:
         """
         Anonymize texts with improved placeholder-based substitution.
@@ -119,44 +172,32 @@ class ImprovedAnonymizer:
         # Reset counters for new session
         self._reset_counters()
         
-        mapeamento = {}  # original -> replacement
-        valores_usados = set()
-        
-        # Generate replacements for each unique sensitive item
-        for original, categoria in itens_sensiveis.items():
-            if original in mapeamento:
-                continue
-                
-            replacement = self._get_replacement_value(original, categoria)
-            
-            # Ensure uniqueness if using fake values
-            if not self.use_placeholders:
-                while replacement in valores_usados:
-                    replacement = self._get_replacement_value(original, categoria)
+        # Generate replacements for each unique sensitive item (keys of itens_sensiveis are already unique)
+        if self.use_placeholders:
+            # Placeholders are numbered per entity type, so they are unique by construction
+            mapeamento = {original: self._get_next_placeholder(categoria)
+                          for original, categoria in itens_sensiveis.items()}
+        else:
+            mapeamento = {}  # original -> replacement
+            valores_usados = set()
+            for original, categoria in itens_sensiveis.items():
+                replacement = self._generate_fake_value(categoria, original)
+                # Ensure uniqueness; some fake values are constant (e.g. CPF/phone masks),
+                # so after a few attempts fall back to a numbered placeholder
+                for _ in range(MAX_FAKE_VALUE_RETRIES):
+                    if replacement not in valores_usados:
+                        break
+                    replacement = self._generate_fake_value(categoria, original)
+                else:
+                    replacement = self._get_next_placeholder(categoria)
                 valores_usados.add(replacement)
-            
-            mapeamento[original] = replacement
+                mapeamento[original] = replacement
         
-        # Perform replacements on each page
-        textos_anonimizados = []
+        # One pass per page instead of one pass per entity
+        replacer = _build_replacer(frozenset(mapeamento.items()), self.preserve_structure)
+        textos_anonimizados = [replacer(texto) for texto in textos_paginas]
         
-        # Sort keys by length (descending) to avoid partial replacements
-        chaves_sensiveis = sorted(mapeamento.keys(), key=len, reverse=True)
-        
-        for texto in textos_paginas:
-            texto_anon = texto
-            
-            for original in chaves_sensiveis:
-                replacement = mapeamento[original]
-                
-                if self.preserve_structure:
-                    texto_anon = self._perform_safe_replacement(texto_anon, original, replacement)
-                else:
-                    texto_anon = texto_anon.replace(original, replacement)
-            
-            textos_anonimizados.append(texto_anon)
-        
-        logger.info(f"Anonymized {len(chaves_sensiveis)} unique entities across {len(textos_paginas)} pages")
+        logger.info(f"Anonymized {len(mapeamento)} unique entities across {len(textos_paginas)} pages")
         
         return textos_anonimizados, mapeamento
     
@@ -178,26 +219,31 @@ class ImprovedAnonymizer:
             }
         }
         
-        if not VALIDATION_CONFIG.get('check_document_integrity', True):
-            return validation_results
+        # Each check is guarded by its own flag, before any page is scanned
+        check_integrity = VALIDATION_CONFIG.get('check_document_integrity', True)
+        check_boundaries = VALIDATION_CONFIG.get('check_token_boundaries', True)
         
-        # Check if any original sensitive data remains
-        for original_text, anon_text in zip(original_texts, anonymized_texts):
-            for original_data in mapping.keys():
-                if original_data.lower() in anon_text.lower():
-                    validation_results['errors'].append(
-                        f"Original data '{original_data}' still present in anonymized text"
-                    )
-                    validation_results['stats']['integrity_check'] = False
+        # Check if any original sensitive data remains, page by page. Each page and each original
+        # is casefolded once; every original is tested on its own, so one nested in another
+        # ('Silva' inside 'Joana Silva') is still reported
+        if check_integrity and mapping:
+            folded_originals = [(original, original.casefold()) for original in mapping]
+            for anon_text in anonymized_texts:
+                folded_page = anon_text.casefold()
+                for original_data, folded in folded_originals:
+                    if folded in folded_page:
+                        validation_results['errors'].append(
+                            f"Original data '{original_data}' still present in anonymized text"
+                        )
+                        validation_results['stats']['integrity_check'] = False
         
         # Check for concatenation issues
-        for anon_text in anonymized_texts:
-            # Look for obvious concatenation patterns
-            concat_pattern = r'\w[A-Z][a-z]+[A-Z]'  # wordNameWord pattern
-            if re.search(concat_pattern, anon_text):
-                validation_results['warnings'].append(
-                    "Potential word concatenation detected in anonymized text"
-                )
+        if check_boundaries:
+            for anon_text in anonymized_texts:
+                if CONCAT_RE.search(anon_text):
+                    validation_results['warnings'].append(
+                        "Potential word concatenation detected in anonymized text"
+                    )
         
         return validation_results
 
@@ -5,19 +5,32 @@ import json # For json.JSONDecodeError
 import fitz # PyMuPDF module for PDF handling
 import threading # For asynchronous operations
 import logging
+import itertools
+from concurrent.futures import ThreadPoolExecutor # Background work off the Tk thread
 
 # Importa funções dos módulos criados
 from pdf_utils import extrair_texto, salvar_pdf_anon
-from detection import encontrar_dados_sensiveis, detector
+from detection import encontrar_dados_sensiveis, get_detector
 from anonymizer import anonimizar_texto, anonymizer
 from validator import validar_anonimizacao
-from mapping_utils import save_mapping, load_mapping # Added
+from mapping_utils import save_mapping, load_mapping, build_replacer # Added
 from config import SUBSTITUTION_CONFIG, VALIDATION_CONFIG, ERROR_MESSAGES
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Número de caracteres exibidos nas pré-visualizações
+TAMANHO_PREVIEW = 500
+
+# Entradas exibidas no log de anonimização e quantas são inseridas por vez na caixa de texto
+MAX_ENTRADAS_LOG = 500
+LOTE_LOG = 200
+
+# Bindtag das caixas de texto só leitura e teclas que continuam funcionando nelas
+TAG_SOMENTE_LEITURA = "SomenteLeitura"
+TECLAS_NAVEGACAO = frozenset(("Left", "Right", "Up", "Down", "Home", "End", "Prior", "Next"))
+
 class PDFAnonymizerApp:
     def __init__(self, root):
         self.root = root
@@ -31,6 +44,8 @@ class PDFAnonymizerApp:
         self.texto_paginas_original = None
         self.texto_paginas_anon = None
         self.mapeamento = None
+        self._reverter_pagina_sessao = None # Reversor montado uma vez a partir do mapeamento da sessão
+        self._reverter_arquivo = (None, None) # (conteúdo do último mapeamento carregado, reversor)
         self.caminho_pdf_anon_salvo = None # To store path of saved anonymized PDF
         self.caminho_mapeamento_salvo = None # To store path of saved mapping file
         
@@ -59,7 +74,12 @@ class PDFAnonymizerApp:
 
         # Lock for thread-safe operations if needed, though root.after is generally safe for UI updates
         self.ui_lock = threading.Lock()
-        self.validation_thread = None
+        self.validation_thread = None # Future da validação em andamento
+        # Threads reaproveitadas por todas as operações em segundo plano
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="anon")
+        # Última extração de texto: ((caminho, mtime_ns, tamanho), páginas). Só um documento fica em memória
+        self._texto_extraido = None
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
         
         # Barra de progresso
         self.progress = ttk.Progressbar(root, orient="horizontal", length=500, mode="determinate") # Increased length
@@ -72,45 +92,117 @@ class PDFAnonymizerApp:
 
         self.label_original_preview = tk.Label(text_preview_frame, text="Original (primeiros 500 chars):")
         self.label_original_preview.pack(anchor="w")
-        self.text_original_preview = tk.Text(text_preview_frame, height=4, width=70, state="disabled", wrap="word")
+        self.text_original_preview = tk.Text(text_preview_frame, height=4, width=70, wrap="word")
         self.text_original_preview.pack(fill="x", expand=True)
 
         self.label_anon_preview = tk.Label(text_preview_frame, text="Anonimizado (primeiros 500 chars):")
         self.label_anon_preview.pack(anchor="w")
-        self.text_anon_preview = tk.Text(text_preview_frame, height=4, width=70, state="disabled", wrap="word")
+        self.text_anon_preview = tk.Text(text_preview_frame, height=4, width=70, wrap="word")
         self.text_anon_preview.pack(fill="x", expand=True)
 
         # Anonymization Log Area
         log_frame = tk.Frame(root)
         log_frame.pack(pady=10, fill="both", expand=True)
 
-        self.label_log = tk.Label(log_frame, text="Log de Anonimização (Original -> Substituto):")
-        self.label_log.pack(anchor="w")
+        log_header = tk.Frame(log_frame)
+        log_header.pack(fill="x")
+        self.label_log = tk.Label(log_header, text="Log de Anonimização (Original -> Substituto):")
+        self.label_log.pack(side="left")
+        # Exibe as entradas além das MAX_ENTRADAS_LOG primeiras, só quando o usuário pede
+        self.btn_mostrar_log = tk.Button(log_header, text="Mostrar tudo", command=self.mostrar_log_completo,
+                                         state="disabled")
+        self.btn_mostrar_log.pack(side="right")
         
-        self.log_text_area = tk.Text(log_frame, height=10, width=70, state="disabled", wrap="word")
+        self.log_text_area = tk.Text(log_frame, height=10, width=70, wrap="word")
         self.log_scroll = tk.Scrollbar(log_frame, command=self.log_text_area.yview)
         self.log_text_area.config(yscrollcommand=self.log_scroll.set)
         
+        self._log_geracao = 0 # Invalida lotes pendentes de um log anterior
+        self._log_mapeamento = None # Mapeamento cujo log foi truncado (só em memória)
         self.log_text_area.pack(side="left", fill="both", expand=True)
         self.log_scroll.pack(side="right", fill="y")
 
+        # As caixas de texto ficam sempre em state="normal" (sem alternar o estado a cada atualização),
+        # mas só leitura para o usuário
+        self._configurar_somente_leitura()
+        for text_area in (self.text_original_preview, self.text_anon_preview, self.log_text_area):
+            text_area.bindtags((TAG_SOMENTE_LEITURA,) + text_area.bindtags())
+
+    def _configurar_somente_leitura(self):
+        """Bloqueia a edição pelo teclado e pela área de transferência, mantendo seleção, cópia e rolagem."""
+        def bloquear_tecla(event):
+            if event.state & 0x4 and event.keysym.lower() in ("c", "a"): # Ctrl+C / Ctrl+A
+                return None
+            if event.keysym in TECLAS_NAVEGACAO:
+                return None
+            return "break"
+        self.root.bind_class(TAG_SOMENTE_LEITURA, "<Key>", bloquear_tecla)
+        for evento in ("<<Paste>>", "<<Cut>>", "<<Clear>>", "<<PasteSelection>>"):
+            self.root.bind_class(TAG_SOMENTE_LEITURA, evento, lambda event: "break")
+
     def _update_preview(self, text_area, content):
-        text_area.config(state="normal")
-        text_area.delete("1.0", tk.END)
-        text_area.insert("1.0", content[:500]) # Show first 500 chars
-        text_area.config(state="disabled")
+        """Mostra os primeiros 500 caracteres do texto, ou da lista de páginas informada."""
+        if not isinstance(content, str):
+            content = self._inicio_paginas(content)
+        text_area.replace("1.0", tk.END, content[:TAMANHO_PREVIEW]) # Show first 500 chars
+
+    @staticmethod
+    def _inicio_paginas(pages):
+        """Junta só as páginas necessárias para preencher a pré-visualização, sem juntar o documento inteiro."""
+        partes = []
+        total = 0
+        for pagina in pages or []:
+            if partes:
+                partes.append("\n")
+                total += 1
+            partes.append(pagina[:TAMANHO_PREVIEW - total])
+            total += len(partes[-1])
+            if total >= TAMANHO_PREVIEW:
+                break
+        return "".join(partes)
 
     def _update_log_area(self, mapping_data):
-        self.log_text_area.config(state="normal")
+        self._log_geracao += 1
         self.log_text_area.delete("1.0", tk.END)
         if mapping_data:
-            log_entries = []
-            for original, fake in mapping_data.items():
-                log_entries.append(f'\"{original}\" -> \"{fake}\"')
-            self.log_text_area.insert("1.0", "\n".join(log_entries))
+            # Formata só as entradas exibidas e as insere em lotes, devolvendo o controle à interface entre eles
+            entradas = (f'\"{original}\" -> \"{fake}\"'
+                        for original, fake in itertools.islice(mapping_data.items(), MAX_ENTRADAS_LOG))
+            aviso = None
+            if len(mapping_data) > MAX_ENTRADAS_LOG:
+                self._log_mapeamento = mapping_data
+                aviso = (f"... mais {len(mapping_data) - MAX_ENTRADAS_LOG} substituições "
+                         f"(clique em \"Mostrar tudo\" para exibi-las)")
+            else:
+                self._log_mapeamento = None
+            self.btn_mostrar_log.config(state="normal" if self._log_mapeamento else "disabled")
+            self._inserir_lote_log(entradas, aviso, self._log_geracao, True)
         else:
+            self._log_mapeamento = None
+            self.btn_mostrar_log.config(state="disabled")
             self.log_text_area.insert("1.0", "Nenhuma substituição realizada ou mapeamento não disponível.")
-        self.log_text_area.config(state="disabled")
+
+    def mostrar_log_completo(self):
+        """Acrescenta ao log as entradas restantes do mapeamento em memória, em lotes."""
+        if not self._log_mapeamento:
+            return
+        mapping_data, self._log_mapeamento = self._log_mapeamento, None
+        self.btn_mostrar_log.config(state="disabled")
+        self._log_geracao += 1 # Cancela lotes ainda pendentes da exibição truncada
+        self.log_text_area.delete("1.0", tk.END)
+        entradas = (f'\"{original}\" -> \"{fake}\"' for original, fake in mapping_data.items())
+        self._inserir_lote_log(entradas, None, self._log_geracao, True)
+
+    def _inserir_lote_log(self, entradas, aviso, geracao, primeiro):
+        """Insere o próximo lote de entradas no log e agenda o seguinte com after_idle."""
+        if geracao != self._log_geracao:
+            return # O log foi substituído enquanto este lote esperava
+        lote = list(itertools.islice(entradas, LOTE_LOG))
+        if lote:
+            self.log_text_area.insert(tk.END, ("" if primeiro else "\n") + "\n".join(lote))
+            self.root.after_idle(self._inserir_lote_log, entradas, aviso, geracao, False)
+        elif aviso:
+            self.log_text_area.insert(tk.END, "\n" + aviso)
 
     def carregar_pdf(self):
         """Abre um diálogo para selecionar um PDF e carrega seu caminho."""
@@ -124,6 +216,7 @@ class PDFAnonymizerApp:
                 self.texto_paginas_original = None
                 self.texto_paginas_anon = None
                 self.mapeamento = None
+                self._reverter_pagina_sessao = None
                 self.caminho_pdf_anon_salvo = None
                 self.caminho_mapeamento_salvo = None
                 self.btn_validar.config(state="disabled")
@@ -133,8 +226,9 @@ class PDFAnonymizerApp:
                 self._update_log_area(None) # Clear log on new PDF load
                 # Optionally, extract and show preview of original text here
                 try:
-                    temp_original_text_pages = extrair_texto(self.caminho_pdf)
-                    self._update_preview(self.text_original_preview, "\n".join(temp_original_text_pages))
+                    # Guarda o texto extraído para a anonimização não precisar ler o PDF de novo
+                    self.texto_paginas_original = self._extrair_texto_cache(self.caminho_pdf)
+                    self._update_preview(self.text_original_preview, self.texto_paginas_original)
                 except Exception as e:  # Catching generic exception for PDF errors
                     messagebox.showerror("Erro de PDF", f"Não foi possível ler o arquivo PDF (pode estar corrompido ou não ser um PDF válido):\n{e}")
                     self._update_preview(self.text_original_preview, f"Erro ao pré-visualizar: PDF inválido ou corrompido.")
@@ -158,12 +252,37 @@ class PDFAnonymizerApp:
                     return
             except Exception as e:
                 messagebox.showerror("Erro Inesperado", f"Ocorreu um erro inesperado ao carregar o PDF:\n{e}")
-                            self.label_status.config(text="Falha ao carregar PDF.")
+                self.label_status.config(text="Falha ao carregar PDF.")
             return
         else:
             # Se nenhum arquivo foi selecionado, não faz nada
             return
     
+    def _submeter(self, funcao, *args):
+        """Executa a função no executor compartilhado; erros não tratados pela função são registrados no log."""
+        futuro = self._executor.submit(funcao, *args)
+        futuro.add_done_callback(self._registrar_falha)
+        return futuro
+
+    def _registrar_falha(self, futuro):
+        if not futuro.cancelled() and futuro.exception() is not None:
+            logger.error(f"Erro em tarefa de segundo plano: {futuro.exception()}")
+
+    def _extrair_texto_cache(self, caminho):
+        """Extrai o texto das páginas do PDF, reaproveitando a última extração se o arquivo não mudou."""
+        info = os.stat(caminho)
+        chave = (caminho, info.st_mtime_ns, info.st_size)
+        cache = self._texto_extraido
+        if cache is None or cache[0] != chave:
+            cache = (chave, tuple(extrair_texto(caminho)))
+            self._texto_extraido = cache
+        return list(cache[1])
+
+    def _on_close(self):
+        """Encerra o executor sem esperar tarefas em andamento e fecha a janela."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.root.destroy()
+
     def _set_ui_busy(self, is_busy=True):
         """Habilita ou desabilita controles da UI durante operações longas."""
         state = "disabled" if is_busy else "normal"
@@ -177,26 +296,27 @@ class PDFAnonymizerApp:
         """Função executada em thread separada para processar a anonimização."""
         try:
             # 1. Extração do texto
-            self.root.after(0, lambda: self.progress.config(value=0))
-            self.root.after(0, lambda: self.label_status.config(text="Extraindo texto do PDF..."))
+            self.root.after(0, self._apply_stage, "Extraindo texto do PDF...", 0)
             
-            self.texto_paginas_original = extrair_texto(self.caminho_pdf)
-            self.root.after(0, lambda: self._update_preview(self.text_original_preview, "\n".join(self.texto_paginas_original)))
-            self.root.after(0, lambda: self.progress.config(value=20))
-            self.root.after(0, lambda: self.label_status.config(text="Texto extraído. Detectando dados sensíveis (método melhorado)..."))
+            # Reaproveita o texto já extraído em carregar_pdf
+            if self.texto_paginas_original is None:
+                self.texto_paginas_original = self._extrair_texto_cache(self.caminho_pdf)
+            self.root.after(0, self._apply_stage, "Texto extraído. Detectando dados sensíveis (método melhorado)...", 20,
+                            self.texto_paginas_original)
             
             # 2. Detecção de dados sensíveis usando detector melhorado
             logger.info("Iniciando detecção de PII com método melhorado")
-            itens_sensiveis = detector.detect_from_texts(self.texto_paginas_original)
+            itens_sensiveis = get_detector().detect_from_texts(self.texto_paginas_original)
             total_encontrados = len(itens_sensiveis)
             logger.info(f"Detectados {total_encontrados} dados sensíveis únicos")
             
-            self.root.after(0, lambda: self.progress.config(value=40))
-            self.root.after(0, lambda: self.label_status.config(text=f"{total_encontrados} dado(s) sensível(is) identificado(s). Anonimizando com placeholders..."))
+            self.root.after(0, self._apply_stage,
+                            f"{total_encontrados} dado(s) sensível(is) identificado(s). Anonimizando com placeholders...", 40)
             
             # 3. Anonimização do texto usando anonymizer melhorado
             logger.info("Iniciando anonimização com substitutos baseados em placeholders")
             self.texto_paginas_anon, self.mapeamento = anonymizer.anonymize_texts(self.texto_paginas_original, itens_sensiveis)
+            self._reverter_pagina_sessao = None # Novo mapeamento: o reversor é remontado na próxima reversão
             
             # Validação pós-anonimização
             validation_results = anonymizer.validate_anonymization(
@@ -210,10 +330,8 @@ class PDFAnonymizerApp:
             
             logger.info(f"Anonimização concluída. Estatísticas: {validation_results['stats']}")
             
-            self.root.after(0, lambda: self._update_preview(self.text_anon_preview, "\n".join(self.texto_paginas_anon)))
-            self.root.after(0, lambda: self.progress.config(value=60))
-            self.root.after(0, lambda: self.label_status.config(text="Texto anonimizado. Salvando arquivos..."))
-            self.root.after(0, lambda: self._update_log_area(self.mapeamento))
+            self.root.after(0, self._apply_stage, "Texto anonimizado. Salvando arquivos...", 60,
+                            None, self.texto_paginas_anon, self.mapeamento)
 
             # 4. Salvar PDF anonimizado
             self.caminho_pdf_anon_salvo = salvar_pdf_anon(self.texto_paginas_anon, self.caminho_pdf)
@@ -223,8 +341,20 @@ class PDFAnonymizerApp:
             
         except Exception as e:
             logger.error(f"Erro na anonimização: {str(e)}")
-            self.root.after(0, lambda: self._handle_error(str(e), "Erro na Anonimização"))
+            self.root.after(0, self._handle_error, str(e), "Erro na Anonimização")
             
+    def _apply_stage(self, status, pct, orig_preview=None, anon_preview=None, log=None):
+        """Aplica de uma vez, na thread principal, as atualizações de interface de uma etapa da anonimização.
+        Só as pré-visualizações e o log informados são atualizados."""
+        self.progress.config(value=pct)
+        self.label_status.config(text=status)
+        if orig_preview is not None:
+            self._update_preview(self.text_original_preview, orig_preview)
+        if anon_preview is not None:
+            self._update_preview(self.text_anon_preview, anon_preview)
+        if log is not None:
+            self._update_log_area(log)
+
     def _finalizar_anonimizacao(self):
         """Finaliza o processo de anonimização na thread principal."""
         try:
@@ -265,7 +395,7 @@ class PDFAnonymizerApp:
         self.label_status.config(text="Iniciando anonimização... Por favor, aguarde.")
         
         # Inicia processo em thread separada
-        threading.Thread(target=self._anonimizar_thread, daemon=True).start()
+        self._submeter(self._anonimizar_thread)
     
     def _perform_validation(self):
         try:
@@ -292,7 +422,7 @@ class PDFAnonymizerApp:
                 msg += "\n(O modelo gerou o seguinte trecho de texto continuando o PDF: ... \"{}\"{})".format(texto_modelo[:100] + "..." if len(texto_modelo)>100 else texto_modelo)
                 messagebox.showwarning("Validação", msg)
             self.label_status.config(text="Validação concluída.")
-        self.validation_thread = None # Clear the thread reference
+        self.validation_thread = None # Clear the future reference
 
     def validar(self):
         """Valida o texto anonimizado em busca de possíveis dados pessoais remanescentes."""
@@ -300,17 +430,18 @@ class PDFAnonymizerApp:
             messagebox.showerror("Erro de Operação", "Nenhum texto anonimizado disponível para validar.")
             return
         
-        if self.validation_thread and self.validation_thread.is_alive():
+        if self.validation_thread and not self.validation_thread.done():
             messagebox.showinfo("Validação", "A validação já está em progresso.")
             return
 
         self._set_ui_busy(True)
         self.label_status.config(text="Validando anonimização (carregando modelo e processando)... Por favor, aguarde.")
-        self.root.update_idletasks()
 
-        # Create and start the validation thread
-        self.validation_thread = threading.Thread(target=self._perform_validation, daemon=True)
-        self.validation_thread.start()
+        # Submit the validation once Tk has repainted the status (no reentrant update_idletasks)
+        self.root.after_idle(self._iniciar_validacao)
+
+    def _iniciar_validacao(self):
+        self.validation_thread = self._submeter(self._perform_validation)
     
     def reverter_sessao(self): # Renamed from reverter
         """Reverte a anonimização da sessão atual, usando o mapeamento em memória."""
@@ -318,25 +449,40 @@ class PDFAnonymizerApp:
             messagebox.showerror("Erro de Reversão", "Nenhuma anonimização na sessão atual para reverter.")
             return
         
-        # Constrói o texto deanonimizado usando o mapeamento (substituindo falsos -> originais)
-        texto_paginas_restaurado = []
-        mapeamento_inverso = {falso: orig for orig, falso in self.mapeamento.items()}
-        chaves_falsas = sorted(mapeamento_inverso.keys(), key=len, reverse=True)
-
-        for texto_anon_pagina in self.texto_paginas_anon: # Iterate through pages
-            texto_restaurado_pagina = texto_anon_pagina
-            for falso in chaves_falsas:
-                original = mapeamento_inverso[falso]
-                texto_restaurado_pagina = texto_restaurado_pagina.replace(falso, original)
-            texto_paginas_restaurado.append(texto_restaurado_pagina)
-        
-        self._update_preview(self.text_original_preview, "\n".join(self.texto_paginas_original or []))
-        self._update_preview(self.text_anon_preview, "\n".join(texto_paginas_restaurado)) # Show reverted in anon preview
+        # Configura UI para indicar processamento e reverte fora da thread da interface
+        self._set_ui_busy(True)
+        self.label_status.config(text="Revertendo a sessão... Por favor, aguarde.")
+        self._submeter(self._reverter_sessao_worker, self.texto_paginas_anon, self.mapeamento)
 
-        texto_original_completo = "\n".join(self.texto_paginas_original) if self.texto_paginas_original else ""
-        texto_restaurado_completo = "\n".join(texto_paginas_restaurado)
+    def _reverter_sessao_worker(self, texto_paginas_anon, mapeamento):
+        """Função de thread para reverter o texto da sessão atual."""
+        try:
+            # Constrói o texto deanonimizado usando o mapeamento (substituindo falsos -> originais)
+            # Um único autômato com todos os valores falsos, montado só na primeira reversão da sessão
+            if self._reverter_pagina_sessao is None:
+                self._reverter_pagina_sessao = build_replacer({falso: orig for orig, falso in mapeamento.items()})
+            # Em série: a substituição é Python puro (presa ao GIL) e já roda fora da thread do Tk
+            reverter_pagina = self._reverter_pagina_sessao
+            texto_paginas_restaurado = [reverter_pagina(pagina) for pagina in texto_paginas_anon]
+            self.root.after(0, self._finalizar_reversao_sessao, texto_paginas_restaurado)
+        except Exception as e:
+            logger.error(f"Erro na reversão da sessão: {str(e)}")
+            self.root.after(0, self._handle_error, str(e), "Erro de Reversão")
+
+    def _finalizar_reversao_sessao(self, texto_paginas_restaurado):
+        """Finaliza a reversão da sessão na thread principal."""
+        self._set_ui_busy(False)
+        self._update_preview(self.text_original_preview, self.texto_paginas_original or [])
+        self._update_preview(self.text_anon_preview, texto_paginas_restaurado) # Show reverted in anon preview
 
-        if self.texto_paginas_original and texto_restaurado_completo == texto_original_completo:
+        # Compara página a página, parando na primeira diferença, sem juntar os dois documentos
+        restaurado_integralmente = (
+            bool(self.texto_paginas_original)
+            and len(self.texto_paginas_original) == len(texto_paginas_restaurado)
+            and all(a == b for a, b in zip(self.texto_paginas_original, texto_paginas_restaurado))
+        )
+
+        if restaurado_integralmente:
             messagebox.showinfo("Reversão da Sessão", "Reversão bem-sucedida! O texto original foi restaurado integralmente na visualização.")
         else:
             messagebox.showinfo(
@@ -351,7 +497,7 @@ class PDFAnonymizerApp:
         """Função de thread para processar a reversão."""
         try:
             # Carregar texto e mapeamento
-            texto_paginas_anon_carregado = extrair_texto(caminho_pdf_anon)
+            texto_paginas_anon_carregado = self._extrair_texto_cache(caminho_pdf_anon)
             mapeamento_carregado = load_mapping(caminho_mapeamento)
             
             if not texto_paginas_anon_carregado or not mapeamento_carregado:
@@ -360,16 +506,8 @@ class PDFAnonymizerApp:
                 return
                 
             # Processar a reversão
-            texto_paginas_restaurado = []
-            mapeamento_inverso = {falso: orig for orig, falso in mapeamento_carregado.items()}
-            chaves_falsas = sorted(mapeamento_inverso.keys(), key=len, reverse=True)
-
-            for texto_anon_pagina in texto_paginas_anon_carregado:
-                texto_restaurado_pagina = texto_anon_pagina
-                for falso in chaves_falsas:
-                    original = mapeamento_inverso[falso]
-                    texto_restaurado_pagina = texto_restaurado_pagina.replace(falso, original)
-                texto_paginas_restaurado.append(texto_restaurado_pagina)
+            reverter_pagina = self._reverter_para(mapeamento_carregado)
+            texto_paginas_restaurado = [reverter_pagina(pagina) for pagina in texto_paginas_anon_carregado]
                 
             self.root.after(0, lambda: self._finalizar_reversao(texto_paginas_anon_carregado, 
                                                                texto_paginas_restaurado, 
@@ -383,6 +521,14 @@ class PDFAnonymizerApp:
         except Exception as e: # Catch-all for other errors during thread execution
             self.root.after(0, lambda: self._finalizar_reversao(None, None, None, f"Erro inesperado na reversão: {e}"))
 
+    def _reverter_para(self, mapeamento):
+        """Retorna o reversor do mapeamento carregado, reaproveitando o anterior se o conteúdo for o mesmo.
+        A chave é o conteúdo, não id(mapeamento): cada carregamento produz um dicionário novo."""
+        chave = frozenset(mapeamento.items())
+        if chave != self._reverter_arquivo[0]:
+            self._reverter_arquivo = (chave, build_replacer({falso: orig for orig, falso in mapeamento.items()}))
+        return self._reverter_arquivo[1]
+
     def _finalizar_reversao(self, texto_paginas_anon_carregado, texto_paginas_restaurado, mapeamento_carregado, error_msg):
         """Finaliza o processo de reversão na thread principal."""
         self._set_ui_busy(False)
@@ -394,8 +540,8 @@ class PDFAnonymizerApp:
             return
             
         # Atualiza a interface com os textos
-        self._update_preview(self.text_original_preview, "\n".join(texto_paginas_anon_carregado))
-        self._update_preview(self.text_anon_preview, "\n".join(texto_paginas_restaurado))
+        self._update_preview(self.text_original_preview, texto_paginas_anon_carregado)
+        self._update_preview(self.text_anon_preview, texto_paginas_restaurado)
         self._update_log_area(mapeamento_carregado)
         
         self.label_status.config(text="Reversão a partir de arquivos concluída.")
@@ -414,15 +560,20 @@ class PDFAnonymizerApp:
             filetypes=[("Arquivos PDF", "*.pdf"), ("Arquivos de Texto", "*.txt")]
         )
         if caminho_salvar_revertido:
+            nome_arquivo = os.path.basename(caminho_salvar_revertido) # Usado em todas as mensagens abaixo
             try:
                 if caminho_salvar_revertido.lower().endswith(".pdf"):
                     salvar_pdf_anon(texto_paginas_restaurado, caminho_salvar_revertido)
-                    messagebox.showinfo("Sucesso", f"PDF revertido salvo em: {os.path.basename(caminho_salvar_revertido)}")
+                    messagebox.showinfo("Sucesso", f"PDF revertido salvo em: {nome_arquivo}")
                 else:
-                    with open(caminho_salvar_revertido, "w", encoding="utf-8") as f:
-                        f.write("\n".join(texto_paginas_restaurado))
-                    messagebox.showinfo("Sucesso", f"Texto revertido salvo em: {os.path.basename(caminho_salvar_revertido)}")
-                self.label_status.config(text=f"Texto revertido salvo em: {os.path.basename(caminho_salvar_revertido)}")
+                    # Escreve página a página num buffer de 1 MiB, sem montar o documento inteiro em memória
+                    with open(caminho_salvar_revertido, "w", encoding="utf-8", buffering=1 << 20) as f:
+                        for i, pagina in enumerate(texto_paginas_restaurado):
+                            if i:
+                                f.write("\n")
+                            f.write(pagina)
+                    messagebox.showinfo("Sucesso", f"Texto revertido salvo em: {nome_arquivo}")
+                self.label_status.config(text=f"Texto revertido salvo em: {nome_arquivo}")
             except Exception as e:
                 messagebox.showerror("Erro ao Salvar", f"Erro ao salvar o arquivo: {str(e)}")
                 self.label_status.config(text="Erro ao salvar arquivo revertido.")
@@ -432,7 +583,6 @@ class PDFAnonymizerApp:
     def carregar_e_reverter(self):
         """Carrega um PDF anonimizado e seu arquivo de mapeamento para reverter."""
         self.label_status.config(text="Selecione o PDF anonimizado...")
-        self.root.update_idletasks()
         caminho_pdf_anon = filedialog.askopenfilename(
             title="Selecione o PDF Anonimizado", 
             filetypes=[("Arquivos PDF", "*.pdf")]
@@ -443,7 +593,6 @@ class PDFAnonymizerApp:
             return
 
         self.label_status.config(text="Selecione o arquivo de mapeamento (.json)...")
-        self.root.update_idletasks()
         caminho_mapeamento = filedialog.askopenfilename(
             title="Selecione o Arquivo de Mapeamento (.json)", 
             filetypes=[("Arquivos JSON", "*.json")]
@@ -456,12 +605,9 @@ class PDFAnonymizerApp:
         # Configura a interface para processamento
         self._set_ui_busy(True)
         self.label_status.config(text="Carregando e revertendo... Por favor, aguarde.")
-        self.root.update_idletasks()
         
-        # Inicia processamento em thread separada
-        threading.Thread(target=self._processar_reversao_thread, 
-                         args=(caminho_pdf_anon, caminho_mapeamento), 
-                         daemon=True).start()
+        # Inicia processamento em thread separada depois que a interface for redesenhada
+        self.root.after_idle(self._submeter, self._processar_reversao_thread, caminho_pdf_anon, caminho_mapeamento)
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -7,6 +7,13 @@ Este arquivo contém as configurações centralizadas incluindo:
 - Configurações de substituição
 """
 
+import os
+
+try:
+    from platformdirs import user_cache_dir  # Opcional: diretório de cache padrão de cada sistema
+except ImportError:
+    user_cache_dir = None
+
 # Whitelist/Stop-terms - termos que NUNCA devem ser anonimizados
 STOP_TERMS = {
     # Termos jurídicos/legais comuns
@@ -57,19 +64,25 @@ STOP_TERMS = {
     "intimado", "citado", "convocado", "arrolado", "qualificado"
 }
 
-# Converter para minúsculas para comparação case-insensitive
-STOP_TERMS = {term.lower() for term in STOP_TERMS}
+# Converter para minúsculas para comparação case-insensitive (frozenset: só consultas de pertinência)
+STOP_TERMS = frozenset(term.strip().lower() for term in STOP_TERMS)
 
-# Padrões regex melhorados com delimitadores de palavra
+# Padrões regex melhorados com delimitadores de palavra.
+# Os separadores são opcionais para cobrir formatos mistos (p.ex. "529982247-25"); como o
+# CPF vem antes do RG na alternativa combinada, um RG nunca fica com o prefixo de um CPF.
 REGEX_PATTERNS = {
     'cpf': r'\b\d{3}\.?\d{3}\.?\d{3}-?\d{2}\b',
     'phone': r'\b(?:\(?\d{2}\)?\s?)?(?:9\s?)?\d{4,5}-?\d{4}\b',
-    'email': r'\b[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}\b',
+    'email': r'\b[\w.%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}\b',  # \w: aceita acentos antes do @ (joão@...)
     'cep': r'\b\d{5}-?\d{3}\b',
     'rg': r'\b\d{1,2}\.?\d{3}\.?\d{3}-?[0-9Xx]\b',
     'cnpj': r'\b\d{2}\.?\d{3}\.?\d{3}/?\d{4}-?\d{2}\b'
 }
 
+# Padrões só de dígitos e pontuação, compilados com re.ASCII (\d e \b sem as tabelas Unicode).
+# Os demais ficam Unicode: o e-mail precisa de \w/\b com acentos e o telefone de \s com NBSP (\xa0)
+ASCII_PATTERN_NAMES = frozenset({'cpf', 'cep', 'rg', 'cnpj'})
+
 # Configurações de substituição
 SUBSTITUTION_CONFIG = {
     'use_placeholders': True,  # Se True, usa placeholders; se False, usa Faker
@@ -81,9 +94,22 @@ SUBSTITUTION_CONFIG = {
 # Configurações do spaCy
 SPACY_CONFIG = {
     'model': 'pt_core_news_sm',
-    'disable_pipes': ['tagger', 'parser'],  # Desabilitar pipes desnecessários
-    'batch_size': 1000,
-    'n_process': 1
+    # Pipes excluídos no carregamento (só o NER é usado); nunca chegam a ser instanciados
+    'exclude_pipes': ['tagger', 'parser', 'attribute_ruler', 'lemmatizer', 'morphologizer'],
+    # Pipes carregados mas desativados (podem ser reativados com nlp.enable_pipe, p.ex. na validação)
+    'disable_pipes': ['senter'],
+    # Com vários processos, cada lote vai para um processo: lotes menores distribuem melhor as páginas
+    # (pode ser ajustado pela variável de ambiente PII_SPACY_BATCH_SIZE)
+    'batch_size': int(os.environ.get('PII_SPACY_BATCH_SIZE', 32)),
+    # 0 = automático: um processo por lote de batch_size textos, deixando um núcleo livre
+    # (documentos curtos ficam num só processo); um valor positivo fixa o número de processos
+    'n_process': 0,
+    # GPU só quando pedida pela variável de ambiente PII_USE_GPU; sem ela nada muda na CPU
+    'use_gpu': bool(os.environ.get('PII_USE_GPU')),
+    # Na GPU um único processo recebe lotes grandes, para ocupar a placa
+    'gpu_batch_size': 4096,
+    # Modo "lazy": só regex na detecção padrão, NER apenas sob pedido (variável PII_LAZY_SPACY=1)
+    'lazy': os.environ.get('PII_LAZY_SPACY', '').lower() in ('1', 'true', 'yes')
 }
 
 # Tipos de entidades para detectar
@@ -131,6 +157,13 @@ ENTITY_RULER_PATTERNS = [
                                {"TEXT": {"REGEX": r"[0-9Xx]"}}]},
 ]
 
+# Diretório onde o pipeline do spaCy já configurado (pipes excluídos + EntityRuler) é salvo.
+# Fica no cache do usuário, não no diretório de trabalho, para que o cache seja o mesmo
+# de onde quer que o programa seja iniciado
+CACHE_DIR = (user_cache_dir('anonimatizacao') if user_cache_dir is not None
+             else os.path.join(os.path.expanduser('~'), '.cache', 'anonimatizacao'))
+NLP_CACHE_PATH = os.path.join(CACHE_DIR, 'nlp_pipeline')
+
 # Configurações de validação
 VALIDATION_CONFIG = {
     'check_stop_terms': True,           # Verificar se stop-terms foram alterados
@@ -159,12 +192,12 @@ VALIDATION_CONFIG = {
     
     # Padrões regex para validar se ainda existem dados sensíveis
     'patterns': {
-        'cpf_pattern': r'\b\d{3}\.?\d{3}\.?\d{3}-?\d{2}\b',
-        'phone_pattern': r'\b(?:\(?\d{2}\)?\s?)?(?:9\s?)?\d{4,5}-?\d{4}\b',
-        'email_pattern': r'\b[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}\b',
-        'cep_pattern': r'\b\d{5}-?\d{3}\b',
-        'rg_pattern': r'\b\d{1,2}\.?\d{3}\.?\d{3}-?[0-9Xx]\b',
-        'cnpj_pattern': r'\b\d{2}\.?\d{3}\.?\d{3}/?\d{4}-?\d{2}\b',
+        'cpf_pattern': REGEX_PATTERNS['cpf'],
+        'phone_pattern': REGEX_PATTERNS['phone'],
+        'email_pattern': REGEX_PATTERNS['email'],
+        'cep_pattern': REGEX_PATTERNS['cep'],
+        'rg_pattern': REGEX_PATTERNS['rg'],
+        'cnpj_pattern': REGEX_PATTERNS['cnpj'],
         'name_pattern': r'\b[A-Z][a-z]+ [A-Z][a-z]+\b',  # Padrão básico de nomes
         'address_pattern': r'\b(?:Rua|Av|Avenida|Alameda|Travessa)\s+[A-Z][^,\n]+\b'
     }
@@ -1,194 +1,495 @@
 '''Module for detecting sensitive data using spaCy and regex with improved accuracy.'''
-import re
+try:
+    import re2 as re  # Optional: google-re2, linear-time DFA matching of the PII patterns
+except ImportError:
+    import re
+import os
+import sys
+import json
+import functools
+import hashlib
+import numpy as np  # Already a spaCy dependency
 import spacy
 import logging
-from typing import List, Dict, Set, Any
-from spacy.pipeline import EntityRuler
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional
+
+try:
+    from thinc.api import set_num_threads  # Not available in every thinc version
+except ImportError:
+    set_num_threads = None
 
 # Import configurations
 from config import (
     STOP_TERMS, REGEX_PATTERNS, SPACY_CONFIG, ENTITY_TYPES, 
-    ENTITY_RULER_PATTERNS, VALIDATION_CONFIG, ERROR_MESSAGES
+    ENTITY_RULER_PATTERNS, VALIDATION_CONFIG, ERROR_MESSAGES, NLP_CACHE_PATH,
+    ASCII_PATTERN_NAMES
 )
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Only texts at least this long are memoized by detect_sensitive_data; shorter ones are cheap
+# to detect again and would just push useful entries out of the cache
+DETECTION_CACHE_MIN_CHARS = 2048
+DETECTION_CACHE_SIZE = 256
+
+# Below this many entities the plain Python sort is faster than building NumPy arrays
+NUMPY_SORT_MIN_ENTITIES = 64
+
+def _config_digest(*parts) -> str:
+    """Short hash of JSON-serializable settings, used to name cache directories."""
+    return hashlib.sha1(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+_CPF_SEPARATORS = str.maketrans('', '', '.-')
+
+# Check-digit weights of the first 9 and first 10 CPF digits
+_CPF_WEIGHTS_1 = np.arange(10, 1, -1, dtype=np.int64)
+_CPF_WEIGHTS_2 = np.arange(11, 1, -1, dtype=np.int64)
+
+# Confidence of a CPF-shaped match whose check digits fail and that fits no other pattern.
+# It is below the default min_confidence_threshold (0.5), so such false positives are pruned;
+# lowering the threshold under this value keeps them (redacted as CPF) instead
+INVALID_CPF_CONFIDENCE = 0.4
+
+def _valid_cpf(cpf: str) -> bool:
+    """
+    Check the two CPF check digits (and reject repeated-digit numbers such as 999.999.999-99,
+    which pass the checksum but are not issued).
+    
+    The digits are read as one uint8 array and each check digit is a single dot product.
+    """
+    raw = cpf.translate(_CPF_SEPARATORS).encode('ascii')
+    if len(raw) != 11:
+        return False
+    digits = np.frombuffer(raw, dtype=np.uint8).astype(np.int64) - 48
+    if (digits == digits[0]).all():
+        return False
+    d1 = int(digits[:9] @ _CPF_WEIGHTS_1) * 10 % 11 % 10
+    d2 = int(digits[:10] @ _CPF_WEIGHTS_2) * 10 % 11 % 10
+    return bool(d1 == digits[9] and d2 == digits[10])
+
+# Digit-only patterns (ASCII_PATTERN_NAMES) skip the Unicode tables; email and phone stay Unicode
+# so accented local parts and NBSP separators still match. google-re2 has no (?a:...) groups, but
+# its \d, \b and \s are ASCII-only anyway
+_ASCII_FLAG = getattr(re, 'ASCII', 0)
+_INLINE_ASCII = re.__name__ == 're'
+
+def _scoped_pattern(name: str, pattern: str) -> str:
+    """Wrap a digit-only pattern in an inline ASCII group for the combined alternation."""
+    return f"(?a:{pattern})" if _INLINE_ASCII and name in ASCII_PATTERN_NAMES else pattern
+
+# Compiled once at import and shared by every detector instance
+_COMPILED_PATTERNS = {name: re.compile(pattern, _ASCII_FLAG if name in ASCII_PATTERN_NAMES else 0)
+                      for name, pattern in REGEX_PATTERNS.items()}
+# All patterns in one alternation: the text is scanned once and the group name gives the type
+_COMBINED_REGEX = re.compile(
+    "|".join(f"(?P<{name}>{_scoped_pattern(name, pattern)})" for name, pattern in REGEX_PATTERNS.items())
+)
+# Entity type of each named group, computed (and interned) once instead of per match
+_REGEX_TYPES_BY_GROUP = {name: sys.intern(name.upper()) for name in REGEX_PATTERNS}
+
+# spaCy label -> entity type in one lookup; the spaCy model labels take precedence over ENTITY_TYPES
+_LABEL_MAP = {
+    label: sys.intern(entity_type)
+    for label, entity_type in {
+        **ENTITY_TYPES,
+        'PER': 'PESSOA', 'PERSON': 'PESSOA',
+        'ORG': 'ORGANIZACAO',
+        'LOC': 'LOCAL', 'GPE': 'LOCAL',
+    }.items()
+}
+
+@dataclass
+class EntitySoA:
+    """
+    Detected entities stored column-wise: one list per field instead of one dict per entity.
+    
+    Dicts ({'text', 'type', 'start', 'end', 'confidence'}) are only built by to_dicts, at the
+    public API boundary.
+    """
+    texts: List[str] = field(default_factory=list)
+    types: List[str] = field(default_factory=list)
+    starts: List[int] = field(default_factory=list)
+    ends: List[int] = field(default_factory=list)
+    confidences: List[float] = field(default_factory=list)
+    
+    def __len__(self) -> int:
+        return len(self.texts)
+    
+    def append(self, text: str, entity_type: str, start: int, end: int, confidence: float):
+        self.texts.append(text)
+        self.types.append(entity_type)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.confidences.append(confidence)
+    
+    def take(self, indices: List[int]) -> 'EntitySoA':
+        """Return the entities at the given indices, in that order."""
+        return EntitySoA([self.texts[i] for i in indices], [self.types[i] for i in indices],
+                         [self.starts[i] for i in indices], [self.ends[i] for i in indices],
+                         [self.confidences[i] for i in indices])
+    
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return [{'text': text, 'type': entity_type, 'start': start, 'end': end, 'confidence': confidence}
+                for text, entity_type, start, end, confidence
+                in zip(self.texts, self.types, self.starts, self.ends, self.confidences)]
+
 class ImprovedPIIDetector:
     """Improved PII detector with stop-terms filtering and enhanced patterns."""
     
-    def __init__(self):
-        self.nlp = None
+    def __init__(self, lazy_spacy: Optional[bool] = None):
+        # Lazy mode: the default detection methods run only the regex pass (NER is far more
+        # expensive); detect_sensitive_data_full still runs both. None uses SPACY_CONFIG['lazy']
+        self.lazy_spacy = SPACY_CONFIG.get('lazy', False) if lazy_spacy is None else lazy_spacy
+        self._nlp = None
+        self._model_loaded = False  # spaCy is loaded on first use of self.nlp
+        # nlp.pipe settings; _load_model switches them when the pipeline runs on the GPU
+        self._pipe_batch_size = SPACY_CONFIG.get('batch_size', 1000)
+        self._pipe_n_process = SPACY_CONFIG.get('n_process', 1)
         self.entity_ruler = None
         self.stop_terms = STOP_TERMS
-        self.regex_patterns = {name: re.compile(pattern) for name, pattern in REGEX_PATTERNS.items()}
+        self.min_confidence = VALIDATION_CONFIG.get('min_confidence_threshold', 0.5)
+        self.regex_patterns = _COMPILED_PATTERNS
+        self.combined_regex = _COMBINED_REGEX
+        self._regex_types_by_group = _REGEX_TYPES_BY_GROUP
+        # Per-instance memo of the filtered entities of long texts (keyed by the text itself)
+        self._detect_cached = functools.lru_cache(maxsize=DETECTION_CACHE_SIZE)(self._detect_soa)
         self.entity_counters = {entity_type: 0 for entity_type in ENTITY_TYPES.values()}
-        self._load_model()
+    
+    @property
+    def nlp(self):
+        """The spaCy pipeline, loaded on first access (None if the model is not installed)."""
+        if not self._model_loaded:
+            self._load_model()
+            self._model_loaded = True
+        return self._nlp
     
     def _load_model(self):
-        """Load and configure the spaCy model with EntityRuler."""
+        """
+        Load and configure the spaCy model with EntityRuler.
+        
+        The configured pipeline is saved under NLP_CACHE_PATH after the first load and loaded
+        from there afterwards. The directory name hashes the model, excluded pipes, ruler
+        patterns and spaCy version, so any change builds a new cache.
+        """
+        # Must run before spacy.load so the model is allocated on the selected device
+        self._configure_device()
+        exclude = SPACY_CONFIG.get('exclude_pipes', [])
+        disable = SPACY_CONFIG.get('disable_pipes', [])
+        cache_dir = f"{NLP_CACHE_PATH}_{_config_digest(SPACY_CONFIG['model'], exclude, disable, ENTITY_RULER_PATTERNS, spacy.__version__)}"
+        if os.path.isdir(cache_dir):
+            try:
+                self._nlp = spacy.load(cache_dir)
+                self.entity_ruler = self._nlp.get_pipe('entity_ruler') if 'entity_ruler' in self._nlp.pipe_names else None
+                logger.info(f"spaCy pipeline loaded from cache {cache_dir}")
+                return
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not load cached spaCy pipeline from {cache_dir}: {e}")
         try:
-            # Load spaCy model
-            self.nlp = spacy.load(SPACY_CONFIG['model'])
-            
-            # Disable unnecessary pipes for better performance
-            disabled_pipes = SPACY_CONFIG.get('disable_pipes', [])
-            for pipe_name in disabled_pipes:
-                if pipe_name in self.nlp.pipe_names:
-                    self.nlp.disable_pipes(pipe_name)
+            # Load spaCy model; unnecessary pipes are excluded so they are never instantiated,
+            # and disabled ones are loaded but skipped when processing
+            self._nlp = spacy.load(SPACY_CONFIG['model'], exclude=exclude, disable=disable)
             
             # Add EntityRuler before the NER component
-            if 'entity_ruler' not in self.nlp.pipe_names:
-                self.entity_ruler = EntityRuler(self.nlp, patterns=ENTITY_RULER_PATTERNS)
-                self.nlp.add_pipe(self.entity_ruler, before='ner')
+            if 'entity_ruler' not in self._nlp.pipe_names:
+                self._add_entity_ruler()
+            
+            # Excluding pipes must not leave a remaining one without the annotations it requires
+            problems = {name: missing for name, missing
+                        in self._nlp.analyze_pipes()['problems'].items() if missing}
+            if problems:
+                logger.warning(f"spaCy pipes missing required annotations: {problems}")
             
             logger.info("spaCy model loaded successfully with EntityRuler")
             
         except OSError:
             logger.error("spaCy model 'pt_core_news_sm' not found. Please download it by running:")
             logger.error("python -m spacy download pt_core_news_sm")
-            self.nlp = None
-
-    def _is_stop_term(self, text: str) -> bool:
-        """Check if a term is in the stop-terms list."""
-        return text.lower().strip() in self.stop_terms
-    
-    def _validate_entity(self, text: str, entity_type: str, confidence: float = 1.0) -> bool:
-        """Validate if an entity should be anonymized."""
-        # Check if it's a stop term
-        if self._is_stop_term(text):
-            logger.warning(ERROR_MESSAGES['stop_term_modified'].format(text))
-            return False
+            self._nlp = None
+            return
         
-        # Check confidence threshold
-        if confidence < VALIDATION_CONFIG.get('min_confidence_threshold', 0.5):
-            logger.warning(ERROR_MESSAGES['low_confidence'].format(text, confidence))
-            return False
+        try:
+            # to_disk only creates the last path component, so create the cache root first
+            os.makedirs(os.path.dirname(cache_dir), exist_ok=True)
+            self._nlp.to_disk(cache_dir)
+        except OSError as e:
+            logger.warning(f"Could not cache spaCy pipeline in {cache_dir}: {e}")
+
+    def _configure_device(self):
+        """Use the GPU when requested (PII_USE_GPU) and available; otherwise tune CPU threads."""
+        if SPACY_CONFIG.get('use_gpu'):
+            if spacy.prefer_gpu():
+                # Worker processes cannot share the GPU: one process fed with large batches instead
+                self._pipe_batch_size = SPACY_CONFIG.get('gpu_batch_size', self._pipe_batch_size)
+                self._pipe_n_process = 1
+                logger.info("spaCy running on GPU")
+                return
+            logger.warning("PII_USE_GPU is set but no GPU is available; running spaCy on CPU")
+        if self._pipe_n_process == 1 and set_num_threads is not None:
+            # A single process can use every core for thinc's matrix multiplications;
+            # with several processes, extra threads per process would only oversubscribe the CPU
+            set_num_threads(os.cpu_count() or 1)
+
+    def _add_entity_ruler(self):
+        """
+        Add the EntityRuler with ENTITY_RULER_PATTERNS before the NER component.
         
-        # Additional validations can be added here
-        return True
-    
-    def _extract_entities_with_spacy(self, text: str) -> List[Dict[str, Any]]:
+        Only needed when the pipeline cache misses: the cached pipeline already contains the ruler.
+        """
+        self.entity_ruler = self._nlp.add_pipe('entity_ruler', before='ner')
+        self.entity_ruler.add_patterns(ENTITY_RULER_PATTERNS)
+
+    def _extract_entities_with_spacy(self, text: str) -> EntitySoA:
         """Extract entities using spaCy NER with improved validation."""
         if not self.nlp:
-            return []
+            return EntitySoA()
         
-        entities = []
-        doc = self.nlp(text)
+        return self._spacy_entities_from_doc(self.nlp(text))
+    
+    def _spacy_entities_from_doc(self, doc, entities: EntitySoA = None) -> EntitySoA:
+        """Map and validate the entities of an already processed spaCy Doc, appending to entities."""
+        if entities is None:
+            entities = EntitySoA()
+        # spaCy spans carry no score, so NER entities have confidence 1.0 (as regex matches do)
+        if not doc.ents or self.min_confidence > 1.0:
+            return entities
+        stop_terms = self.stop_terms
+        doc_text = doc.text  # Sliced directly below instead of going through Span.text
         
+        label_map = _LABEL_MAP
+        append = entities.append
         for ent in doc.ents:
             # Map spaCy labels to our entity types
-            entity_type = None
-            if ent.label_ in ["PER", "PERSON"]:
-                entity_type = "PESSOA"
-            elif ent.label_ == "ORG":
-                entity_type = "ORGANIZACAO"
-            elif ent.label_ in ["LOC", "GPE"]:
-                entity_type = "LOCAL"
-            elif ent.label_ in ENTITY_TYPES.keys():
-                entity_type = ENTITY_TYPES[ent.label_]
-            
-            if entity_type and ent.text.strip():
-                # Validate entity before adding
-                if self._validate_entity(ent.text, entity_type, 
-                                       getattr(ent, 'confidence', 1.0)):
-                    entities.append({
-                        'text': ent.text,
-                        'type': entity_type,
-                        'start': ent.start_char,
-                        'end': ent.end_char,
-                        'confidence': getattr(ent, 'confidence', 1.0)
-                    })
+            entity_type = label_map.get(ent.label_)
+            if entity_type is None:
+                continue
+            start_char, end_char = ent.start_char, ent.end_char
+            raw = doc_text[start_char:end_char]
+            stripped = raw.strip()
+            # A single character is never worth replacing (and would be replaced everywhere)
+            if len(stripped) < 2:
+                continue
+            if stripped.lower() in stop_terms:
+                logger.warning(ERROR_MESSAGES['stop_term_modified'].format(stripped))
+                continue
+            append(raw, entity_type, start_char, end_char, 1.0)
         
         return entities
     
-    def _extract_entities_with_regex(self, text: str) -> List[Dict[str, Any]]:
-        """Extract entities using improved regex patterns."""
-        entities = []
+    def _extract_entities_with_regex(self, text: str, entities: EntitySoA = None) -> EntitySoA:
+        """
+        Extract entities using improved regex patterns, appending to entities.
+        
+        Uses the combined alternation, so each match is non-overlapping and, when several
+        patterns match at the same position, the one listed first in REGEX_PATTERNS wins.
+        """
+        if entities is None:
+            entities = EntitySoA()
+        stop_terms = self.stop_terms
+        if self.min_confidence > 1.0:  # Regex matches have confidence 1.0
+            return entities
         
-        for pattern_name, pattern in self.regex_patterns.items():
-            entity_type = pattern_name.upper()
+        types_by_group = self._regex_types_by_group
+        append = entities.append
+        for match in self.combined_regex.finditer(text):
+            matched_text = match.group(0)
+            group = match.lastgroup
             
-            for match in pattern.finditer(text):
-                matched_text = match.group(0)
-                
-                # Validate entity before adding
-                if self._validate_entity(matched_text, entity_type):
-                    entities.append({
-                        'text': matched_text,
-                        'type': entity_type,
-                        'start': match.start(),
-                        'end': match.end(),
-                        'confidence': 1.0  # Regex matches have high confidence
-                    })
+            # Matches never start or end with whitespace, so no strip is needed
+            if len(matched_text) < 2:
+                continue
+            if matched_text.lower() in stop_terms:
+                logger.warning(ERROR_MESSAGES['stop_term_modified'].format(matched_text))
+                continue
+            # Regex matches have high confidence
+            confidence = 1.0
+            if group == 'cpf' and not _valid_cpf(matched_text):
+                # Not a valid CPF, but the same digits may still be another identifier
+                # (e.g. an 11-digit phone number); otherwise it is a CPF with low confidence,
+                # pruned unless min_confidence is lowered below INVALID_CPF_CONFIDENCE
+                group = self._reclassify(matched_text, exclude='cpf')
+                if group is None:
+                    if INVALID_CPF_CONFIDENCE < self.min_confidence:
+                        logger.warning(ERROR_MESSAGES['low_confidence'].format(matched_text, INVALID_CPF_CONFIDENCE))
+                        continue
+                    group = 'cpf'
+                    confidence = INVALID_CPF_CONFIDENCE
+            append(matched_text, types_by_group[group], match.start(), match.end(), confidence)
         
         return entities
     
-    def _remove_overlaps(self, entities: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _reclassify(self, matched_text: str, exclude: str) -> Optional[str]:
+        """Return the first other pattern (in REGEX_PATTERNS order) matching the whole text, if any."""
+        for name, pattern in self.regex_patterns.items():
+            if name != exclude and pattern.fullmatch(matched_text):
+                return name
+        return None
+    
+    def _remove_overlaps(self, entities: EntitySoA) -> EntitySoA:
         """Remove overlapping entities, preferring higher confidence and longer spans."""
         if not entities:
             return entities
         
+        starts, ends = entities.starts, entities.ends
         # Sort by start position, then by confidence (descending), then by length (descending)
-        entities.sort(key=lambda x: (x['start'], -x['confidence'], -(x['end'] - x['start'])))
+        if len(entities) < NUMPY_SORT_MIN_ENTITIES:
+            confidences = entities.confidences
+            order = sorted(range(len(entities)),
+                           key=lambda i: (starts[i], -confidences[i], starts[i] - ends[i]))
+        else:
+            # Same (stable) order computed on the columns, without a key tuple per entity
+            starts_arr = np.asarray(starts, dtype=np.int64)
+            order = np.lexsort((starts_arr - np.asarray(ends, dtype=np.int64),
+                                -np.asarray(entities.confidences, dtype=np.float64),
+                                starts_arr)).tolist()
         
-        filtered_entities = []
+        kept = []
         last_end = -1
         
-        for entity in entities:
+        # The sweep stays sequential: whether an entity is kept depends on the last *kept* end
+        for i in order:
             # If this entity doesn't overlap with the previous one, add it
-            if entity['start'] >= last_end:
-                filtered_entities.append(entity)
-                last_end = entity['end']
+            if starts[i] >= last_end:
+                kept.append(i)
+                last_end = ends[i]
+        
+        return entities.take(kept)
+    
+    def _detect_soa(self, text: str, use_spacy: bool = True) -> EntitySoA:
+        """Run NER (unless use_spacy is False) and the regex pass on a text, returning the filtered entities."""
+        entities = self._extract_entities_with_spacy(text) if use_spacy else EntitySoA()
+        self._extract_entities_with_regex(text, entities)
+        return self._remove_overlaps(entities)
+    
+    def _detect(self, text: str, use_spacy: bool) -> List[Dict[str, Any]]:
+        if not text or not text.strip():
+            return []
+        
+        if len(text) >= DETECTION_CACHE_MIN_CHARS:
+            filtered_entities = self._detect_cached(text, use_spacy)
+        else:
+            filtered_entities = self._detect_soa(text, use_spacy)
+        
+        logger.info(f"Detected {len(filtered_entities)} entities after filtering")
         
-        return filtered_entities
+        return filtered_entities.to_dicts()
     
     def detect_sensitive_data(self, text: str) -> List[Dict[str, Any]]:
         """
         Detect sensitive data with improved accuracy and validation.
         
+        In lazy mode (lazy_spacy) only the regex patterns are applied.
+        
         Args:
             text: Input text to analyze
             
         Returns:
             List of detected entities with metadata
         """
-        if not text or not text.strip():
-            return []
+        return self._detect(text, use_spacy=not self.lazy_spacy)
+    
+    def detect_sensitive_data_full(self, text: str) -> List[Dict[str, Any]]:
+        """Like detect_sensitive_data, but always runs spaCy NER as well, even in lazy mode."""
+        return self._detect(text, use_spacy=True)
+    
+    def _choose_nproc(self, n_texts: int) -> int:
+        """Number of processes for nlp.pipe: one per batch of texts, leaving a core free."""
+        if self._pipe_n_process > 0:
+            return self._pipe_n_process
+        return max(1, min((os.cpu_count() or 1) - 1, n_texts // self._pipe_batch_size))
+    
+    def _detect_batch_soa(self, texts: List[str], use_spacy: Optional[bool] = None) -> List[EntitySoA]:
+        """Columnar version of detect_sensitive_data_batch; use_spacy defaults to not lazy_spacy."""
+        if use_spacy is None:
+            use_spacy = not self.lazy_spacy
+        results = [EntitySoA() for _ in texts]
+        # Repeated texts (headers, footers, identical pages) are detected once: index of first occurrence
+        first_index = {}
+        for i, text in enumerate(texts):
+            if text and text.strip():
+                first_index.setdefault(text, i)
+        indices = list(first_index.values())
+        if not indices:
+            return results
         
-        all_entities = []
+        # Batched NER: spaCy amortizes per-call overhead and can use several processes
+        if use_spacy and self.nlp:
+            docs = self.nlp.pipe((texts[i] for i in indices),
+                                 batch_size=self._pipe_batch_size,
+                                 n_process=self._choose_nproc(len(indices)))
+        else:
+            docs = (None for _ in indices)
         
-        # Extract entities using spaCy
-        spacy_entities = self._extract_entities_with_spacy(text)
-        all_entities.extend(spacy_entities)
+        total = 0
+        for i, doc in zip(indices, docs):
+            entities = self._spacy_entities_from_doc(doc) if doc is not None else EntitySoA()
+            self._extract_entities_with_regex(texts[i], entities)
+            results[i] = self._remove_overlaps(entities)
+            total += len(results[i])
         
-        # Extract entities using regex
-        regex_entities = self._extract_entities_with_regex(text)
-        all_entities.extend(regex_entities)
+        if len(indices) < len(texts):
+            for i, text in enumerate(texts):
+                first = first_index.get(text)
+                if first is not None and first != i:
+                    results[i] = results[first]
         
-        # Remove overlapping entities
-        filtered_entities = self._remove_overlaps(all_entities)
+        logger.info(f"Detected {total} entities in {len(indices)} distinct texts after filtering")
         
-        logger.info(f"Detected {len(filtered_entities)} entities after filtering")
+        return results
+    
+    def detect_sensitive_data_batch(self, texts: List[str],
+                                    use_spacy: Optional[bool] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Detect sensitive data in several texts, running spaCy over them with nlp.pipe.
         
-        return filtered_entities
+        Args:
+            texts: Input texts to analyze (e.g. one per page)
+            use_spacy: Whether to run NER; None follows lazy_spacy
+            
+        Returns:
+            One list of detected entities per input text, as detect_sensitive_data returns
+        """
+        return [entities.to_dicts() for entities in self._detect_batch_soa(texts, use_spacy)]
+    
+    def detect_from_texts(self, texts: List[str]) -> Dict[str, str]:
+        """
+        Detect sensitive data in all page texts.
+        
+        Args:
+            texts: List of page texts
+            
+        Returns:
+            Dictionary mapping each unique sensitive text to its entity type
+        """
+        found = {}
+        for entities in self._detect_batch_soa(texts):
+            found.update(zip(entities.texts, entities.types))
+        return found
 
-# Global detector instance
-detector = ImprovedPIIDetector()
+# Global detector instance, created on first use
+_detector = None
+
+def get_detector() -> ImprovedPIIDetector:
+    """Return the shared detector, creating it on the first call."""
+    global _detector
+    if _detector is None:
+        _detector = ImprovedPIIDetector()
+    return _detector
 
 # Legacy functions for backward compatibility
 def detect_sensitive_data(text: str) -> List[Dict[str, str]]:
     """Legacy function for backward compatibility."""
-    entities = detector.detect_sensitive_data(text)
+    entities = get_detector().detect_sensitive_data(text)
     # Convert to legacy format
     return [{'text': ent['text'], 'type': ent['type']} for ent in entities]
 
 # Keep old regex patterns for compatibility
 CPF_REGEX = REGEX_PATTERNS['cpf']
-PHONE_REGEX = REGEX_PATTERNS['phone'] 
+PHONE_REGEX = REGEX_PATTERNS['phone']
 EMAIL_REGEX = REGEX_PATTERNS['email']
-PADRAO_CPF = re.compile(CPF_REGEX)
+PADRAO_CPF = _COMPILED_PATTERNS['cpf']
 
 # Keep old PII_TYPES for compatibility
 PII_TYPES = {
@@ -201,81 +502,16 @@ PII_TYPES = {
     "MISC": "MISC"
 }
 
-def detect_sensitive_data(text: str) -> list[dict[str, str]]:
-    """
-    Detects sensitive data (PII) in a given text using spaCy NER and regular expressions.
-
-    Args:
-        text: The input text to analyze.
-
-    Returns:
-        A list of dictionaries, where each dictionary represents a detected sensitive item
-        and contains 'text' (the detected string) and 'type' (the PII type).
-        Returns an empty list if no sensitive data is found or if nlp model is not loaded.
-    """
-    if nlp is None:
-        print("spaCy model not loaded. Cannot perform NER.")
-        return []
-
-    detected_items = []
-    processed_texts = set() # To avoid duplicate entries of the exact same text span
-
-    # 1. Named Entity Recognition (NER) with spaCy
-    doc = nlp(text)
-    for ent in doc.ents:
-        if ent.label_ in ["PER", "LOC", "ORG", "MISC"]:
-            # Ensure we don't add empty or whitespace-only entities
-            if ent.text.strip() and ent.text not in processed_texts:
-                detected_items.append({"text": ent.text, "type": PII_TYPES.get(ent.label_, ent.label_)})
-                processed_texts.add(ent.text)
-
-    # 2. Regular Expressions for PII
-    # CPF
-    for match in re.finditer(CPF_REGEX, text):
-        cpf = match.group(0)
-        if cpf not in processed_texts:
-            detected_items.append({"text": cpf, "type": PII_TYPES["CPF"]})
-            processed_texts.add(cpf)
-            
-    # Telefones
-    for match in re.finditer(PHONE_REGEX, text):
-        phone = match.group(0)
-        if phone not in processed_texts:
-            detected_items.append({"text": phone, "type": PII_TYPES["TELEFONE"]})
-            processed_texts.add(phone)
-
-    # E-mails
-    for match in re.finditer(EMAIL_REGEX, text):
-        email = match.group(0)
-        if email not in processed_texts:
-            detected_items.append({"text": email, "type": PII_TYPES["EMAIL"]})
-            processed_texts.add(email)
-            
-    # 3. Unification of Results (handled by processed_texts set for basic deduplication)
-    # More sophisticated deduplication might be needed if spaCy and regex overlap
-    # e.g. spaCy identifies "email@example.com" as MISC and regex identifies it as EMAIL.
-    # For now, we accept both if their text representation is slightly different or if one is a substring of another.
-    # A more robust approach would be to check for overlapping spans.
-
-    # A simple way to further remove duplicates that might have different types but same text
-    final_detected_items = []
-    seen_texts_for_final_list = set()
-    for item in detected_items:
-        if item["text"] not in seen_texts_for_final_list:
-            final_detected_items.append(item)
-            seen_texts_for_final_list.add(item["text"])
-            
-    return final_detected_items
-
-def encontrar_dados_sensiveis(textos_paginas: List[str]) -> Dict[str, str]:
+def encontrar_dados_sensiveis(textos_paginas: List[str], lazy_spacy: Optional[bool] = None) -> Dict[str, str]:
     """
     Legacy function for backward compatibility.
     Returns a dictionary mapping sensitive text to its category.
+    With lazy_spacy=True only the regex patterns are applied (None follows the detector's mode).
     """
     encontrados = {}
+    use_spacy = None if lazy_spacy is None else not lazy_spacy
     
-    for texto in textos_paginas:
-        entities = detector.detect_sensitive_data(texto)
+    for entities in get_detector().detect_sensitive_data_batch(textos_paginas, use_spacy):
         for entity in entities:
             # Map new types to legacy types
             legacy_type = entity['type']
@@ -306,6 +542,7 @@ if __name__ == '__main__':
     """
 
     print("Testing improved PII detection...")
+    detector = get_detector()
     if detector.nlp:
         sensitive_data_found = detector.detect_sensitive_data(sample_text_pt)
         if sensitive_data_found:
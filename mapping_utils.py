@@ -1,5 +1,34 @@
 import json
 import os
+import re
+
+try:
+    import orjson # optional: faster JSON encoding/decoding of mapping files
+except ImportError:
+    orjson = None
+
+try:
+    import ahocorasick # pyahocorasick, optional: multi-pattern reversion in linear time
+except ImportError:
+    ahocorasick = None
+
+def _write_json(mapping: dict, path: str):
+    """Writes the mapping as UTF-8 JSON, with orjson when it is installed."""
+    if orjson is not None:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(mapping, option=orjson.OPT_INDENT_2))
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(mapping, f, ensure_ascii=False, indent=4)
+
+def _read_json(path: str):
+    """Reads a JSON file, with orjson when it is installed.
+    orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch the same exception."""
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
 
 def save_mapping(mapping: dict, original_pdf_path: str, suffix: str = "_mapping.json") -> str:
     """Saves the mapping dictionary to a JSON file in the same directory as the original PDF.
@@ -16,8 +45,7 @@ def save_mapping(mapping: dict, original_pdf_path: str, suffix: str = "_mapping.
     base_name = os.path.splitext(original_pdf_path)[0]
     mapping_file_path = base_name + suffix
     try:
-        with open(mapping_file_path, 'w', encoding='utf-8') as f:
-            json.dump(mapping, f, ensure_ascii=False, indent=4)
+        _write_json(mapping, mapping_file_path)
         return mapping_file_path
     except IOError as e:
         # Handle potential errors during file writing
@@ -34,9 +62,7 @@ def load_mapping(mapping_file_path: str) -> dict | None:
         The loaded mapping dictionary, or None if an error occurs.
     """
     try:
-        with open(mapping_file_path, 'r', encoding='utf-8') as f:
-            mapping = json.load(f)
-        return mapping
+        return _read_json(mapping_file_path)
     except FileNotFoundError:
         print(f"Mapping file not found: {mapping_file_path}")
         return None
@@ -47,6 +73,75 @@ def load_mapping(mapping_file_path: str) -> dict | None:
         print(f"Error loading mapping file {mapping_file_path}: {e}")
         return None
 
+def build_replacer(substituicoes: dict):
+    """Builds a function that replaces every searched value in a page with its replacement.
+
+    Used in both directions: with the mapping itself (original_value: fake_value) it
+    anonymizes, with the inverse mapping (fake_value: original_value) it reverts.
+
+    All searched values are looked up in one pass over the page with an Aho-Corasick automaton,
+    instead of rescanning the page once per value. At each position the leftmost, longest
+    searched value wins. Without pyahocorasick, falls back to a single compiled regex
+    alternation of the searched values, longest first, which has the same priority.
+
+    Single-character values replaced by single characters (e.g. masked letters) are handled
+    first with str.translate, when neither character appears in a longer searched value, so
+    the result is the same as replacing everything in one pass.
+
+    Args:
+        substituicoes: Dictionary of searched_value: replacement.
+
+    Returns:
+        A callable taking a page text and returning the page with the replacements applied.
+    """
+    chars_multiplos = set().union(*(procurado for procurado in substituicoes if len(procurado) > 1))
+    unicos = {procurado: substituto for procurado, substituto in substituicoes.items()
+              if len(procurado) == 1 and len(substituto) == 1
+              and procurado not in chars_multiplos and substituto not in chars_multiplos}
+    substituir_multiplos = _build_multi_replacer(
+        {procurado: substituto for procurado, substituto in substituicoes.items() if procurado not in unicos})
+    if not unicos:
+        return substituir_multiplos
+    tabela = str.maketrans(unicos)
+    return lambda pagina: substituir_multiplos(pagina.translate(tabela))
+
+def _build_multi_replacer(substituicoes: dict):
+    """Builds the single-pass replacer (automaton or regex) for a dictionary of replacements."""
+    if not substituicoes:
+        return lambda pagina: pagina
+    if ahocorasick is not None:
+        automato = ahocorasick.Automaton()
+        for procurado, substituto in substituicoes.items():
+            automato.add_word(procurado, (len(procurado), substituto))
+        automato.make_automaton()
+        return lambda pagina: _replace_automaton(pagina, automato)
+    # Alternância ordenada do maior para o menor preserva a prioridade das chaves mais longas
+    procurados = sorted(substituicoes.keys(), key=len, reverse=True)
+    pattern = re.compile("|".join(map(re.escape, procurados)))
+    # Métodos ligados como argumentos padrão: sem busca de atributos a cada ocorrência
+    def _repl(m, get=substituicoes.__getitem__, grupo=re.Match.group):
+        return get(grupo(m))
+    substituir = pattern.sub
+    return lambda pagina: substituir(_repl, pagina)
+
+def _replace_automaton(pagina: str, automato) -> str:
+    """Applies the automaton to a page, always keeping the leftmost and longest match."""
+    ocorrencias = sorted(
+        (fim - tamanho + 1, -tamanho, substituto) for fim, (tamanho, substituto) in automato.iter(pagina)
+    )
+    if not ocorrencias:
+        return pagina
+    partes = []
+    cursor = 0
+    for inicio, tamanho_neg, substituto in ocorrencias:
+        if inicio < cursor: # Sobrepõe uma substituição já aplicada
+            continue
+        partes.append(pagina[cursor:inicio])
+        partes.append(substituto)
+        cursor = inicio - tamanho_neg
+    partes.append(pagina[cursor:])
+    return "".join(partes)
+
 # Example Usage (optional, for testing the module directly)
 if __name__ == '__main__':
     sample_map = {"João Silva": "Carlos Pereira", "123.456.789-00": "987.654.321-99"}
@@ -6,6 +6,9 @@ import logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Flags só de texto (sem imagens nem blocos extras); None mantém o padrão em versões antigas do PyMuPDF
+FLAGS_TEXTO = getattr(fitz, "TEXTFLAGS_TEXT", None)
+
 def extrair_texto(caminho_pdf: str):
     """Extrai o texto de todas as páginas do PDF especificado e retorna uma lista de strings (uma por página)."""
     if not os.path.exists(caminho_pdf):
@@ -20,7 +23,7 @@ def extrair_texto(caminho_pdf: str):
                 
             for pagina in doc:
                 try:
-                    texto = pagina.get_text()  # extrai o texto bruto da página
+                    texto = pagina.get_text("text", flags=FLAGS_TEXTO, sort=False)  # extrai o texto bruto da página
                     # Normalização básica: remover espaços extras no início/fim
                     texto = texto.strip()
                     texto_paginas.append(texto)
@@ -33,6 +36,19 @@ def extrair_texto(caminho_pdf: str):
             
     return texto_paginas
 
+# Tamanhos de fonte tentados, do maior para o menor, até o texto da página caber na caixa
+TAMANHOS_FONTE = (11, 9, 7)
+
+def _inserir_texto_pagina(pagina, texto: str, margem_inferior: float = 72):
+    """Insere o texto numa caixa com margens de 1 polegada, com quebra de linha automática.
+    Se nem no menor tamanho de fonte o texto couber, insere-o a partir de (72,72) sem quebra, como antes."""
+    caixa = fitz.Rect(72, 72, pagina.rect.width - 72, pagina.rect.height - margem_inferior)
+    for tamanho in TAMANHOS_FONTE:
+        # insert_textbox não escreve nada e retorna valor negativo quando o texto não cabe
+        if pagina.insert_textbox(caixa, texto, fontsize=tamanho, fontname="helv") >= 0:
+            return
+    pagina.insert_text(fitz.Point(72, 72), texto, fontsize=TAMANHOS_FONTE[-1])
+
 def salvar_pdf_anon(texto_paginas_anonimizado: list, caminho_pdf_original: str):
     """Gera um PDF novo com o texto anonimizado. Retorna o caminho do arquivo PDF salvo."""
     if not texto_paginas_anonimizado:
@@ -46,12 +62,11 @@ def salvar_pdf_anon(texto_paginas_anonimizado: list, caminho_pdf_original: str):
         
         for i, texto in enumerate(texto_paginas_anonimizado):
             try:
-                # Cria uma nova página e insere o texto anonimizado na posição (72,72) 
-                # (1 polegada de margem nas bordas) com fonte padrão.
+                # Cria uma nova página e insere o texto anonimizado
+                # (1 polegada de margem nas bordas), quebrando as linhas longas.
+                # A caixa termina acima do rodapé com o número da página.
                 pagina = doc.new_page()
-                
-                # Adiciona número da página e configurações melhores para texto
-                pagina.insert_text(fitz.Point(72, 72), texto, fontsize=11)
+                _inserir_texto_pagina(pagina, texto, margem_inferior=90)
                 
                 # Adiciona número da página no rodapé
                 pagina.insert_text(
@@ -66,13 +81,14 @@ def salvar_pdf_anon(texto_paginas_anonimizado: list, caminho_pdf_original: str):
                 pagina.insert_text(fitz.Point(72, 72), f"[ERRO AO PROCESSAR PÁGINA {i+1}]")
         
         try:
-            doc.save(caminho_saida)
+            # Remove objetos não usados e comprime os fluxos de uma vez ao salvar
+            doc.save(caminho_saida, garbage=4, deflate=True, clean=True)
             logger.info(f"PDF anonimizado salvo em: {caminho_saida}")
         except Exception as e:
             logger.error(f"Erro ao salvar o PDF: {str(e)}")
             # Tenta salvar em local alternativo se houver erro de permissão
             alternative_path = os.path.join(os.path.expanduser("~"), f"documento_anonimizado_{os.path.basename(caminho_saida)}")
-            doc.save(alternative_path)
+            doc.save(alternative_path, garbage=4, deflate=True, clean=True)
             logger.info(f"PDF salvo em local alternativo: {alternative_path}")
             return alternative_path
             
@@ -2,7 +2,7 @@ import transformers
 import re
 import logging
 from typing import List, Tuple, Dict, Any
-from config import VALIDATION_CONFIG, ERROR_MESSAGES
+from config import VALIDATION_CONFIG, ERROR_MESSAGES, ASCII_PATTERN_NAMES
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -11,7 +11,9 @@ logger = logging.getLogger(__name__)
 VALIDATION_PATTERNS = {}
 for pattern_name, pattern_value in VALIDATION_CONFIG['patterns'].items():
     try:
-        VALIDATION_PATTERNS[pattern_name] = re.compile(pattern_value)
+        # Only digit-only patterns use re.ASCII; names, addresses, e-mails and phones need Unicode \b, \w and \s
+        flags = re.ASCII if pattern_name.replace('_pattern', '') in ASCII_PATTERN_NAMES else 0
+        VALIDATION_PATTERNS[pattern_name] = re.compile(pattern_value, flags)
         logger.debug(f"Compiled validation pattern '{pattern_name}': {pattern_value}")
     except re.error as e:
         logger.error(f"Failed to compile validation pattern '{pattern_name}': {e}")